@@ -21,6 +21,8 @@ export default function AdminDashboardPage() {
   const [summary, setSummary] = useState(null);
   const [charts, setCharts] = useState(null);
   const [bookings, setBookings] = useState([]);
+  const [bookingsCursor, setBookingsCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [services, setServices] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
@@ -67,6 +69,7 @@ export default function AdminDashboardPage() {
         setSummary(summaryData.summary);
         setCharts(chartsData.charts ?? null);
         setBookings(bookingsData.bookings ?? []);
+        setBookingsCursor(bookingsData.next_cursor ?? null);
         setServices(servicesData.services ?? []);
       } catch (err) {
         console.error(err);
@@ -78,6 +81,28 @@ export default function AdminDashboardPage() {
     load();
   }, [router]);
 
+  async function handleLoadMoreBookings() {
+    const token = getToken();
+    if (!token || !bookingsCursor) return;
+    setLoadingMore(true);
+    try {
+      const params = new URLSearchParams({ cursor: bookingsCursor });
+      const res = await fetch(`${API_BASE}/api/bookings?${params}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      const data = await res.json();
+      if (!res.ok || !data.success) {
+        throw new Error(data.message || "Failed to load bookings");
+      }
+      setBookings((prev) => [...prev, ...(data.bookings ?? [])]);
+      setBookingsCursor(data.next_cursor ?? null);
+    } catch (err) {
+      alert(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   async function handleStatusChange(id, status, time_slot) {
     const token = getToken();
     if (!token) return;
@@ -352,6 +377,18 @@ export default function AdminDashboardPage() {
               </tbody>
             </table>
           </div>
+          {bookingsCursor && (
+            <div className="pt-3 text-center">
+              <Button
+                variant="outline"
+                className="h-7 px-3 text-[11px]"
+                disabled={loadingMore}
+                onClick={handleLoadMoreBookings}
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </Button>
+            </div>
+          )}
         </Card>
 
         <Card>
@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { Input } from "../../components/ui/input";
 import { Label } from "../../components/ui/label";
 import { Button } from "../../components/ui/button";
@@ -9,6 +9,10 @@ import { Button } from "../../components/ui/button";
 const API_BASE =
   process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:4000";
 
+// Network failures are retried with the same Idempotency-Key, so a request
+// that reached the server before the connection dropped is not booked twice
+const SUBMIT_ATTEMPTS = 3;
+
 export default function BookPage() {
   const [step, setStep] = useState(1);
   const [services, setServices] = useState([]);
@@ -16,6 +20,8 @@ export default function BookPage() {
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState("");
   const [success, setSuccess] = useState("");
+  // One key per booking attempt; cleared when the form changes or succeeds
+  const idempotencyKey = useRef(null);
 
   const [form, setForm] = useState({
     name: "",
@@ -44,6 +50,7 @@ export default function BookPage() {
   }, []);
 
   const handleChange = (field) => (e) => {
+    idempotencyKey.current = null;
     setForm((prev) => ({ ...prev, [field]: e.target.value }));
   };
 
@@ -57,12 +64,33 @@ export default function BookPage() {
     setError("");
     setSuccess("");
     setSubmitting(true);
+    if (!idempotencyKey.current) {
+      idempotencyKey.current = crypto.randomUUID();
+    }
     try {
-      const res = await fetch(`${API_BASE}/api/public/bookings`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(form),
-      });
+      let res;
+      for (let attempt = 1; ; attempt++) {
+        try {
+          res = await fetch(`${API_BASE}/api/public/bookings`, {
+            method: "POST",
+            headers: {
+              "Content-Type": "application/json",
+              "Idempotency-Key": idempotencyKey.current,
+            },
+            body: JSON.stringify(form),
+          });
+        } catch (networkError) {
+          if (attempt >= SUBMIT_ATTEMPTS) throw networkError;
+          await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+          continue;
+        }
+        // The first attempt is still running on the server; ask again shortly
+        if (res.status === 409 && attempt < SUBMIT_ATTEMPTS) {
+          await new Promise((resolve) => setTimeout(resolve, 1000));
+          continue;
+        }
+        break;
+      }
       const data = await res.json();
       if (!res.ok || !data.success) {
         throw new Error(data.message || "Failed to submit booking");
@@ -70,6 +98,7 @@ export default function BookPage() {
       setSuccess(
         "Your appointment request has been submitted. We will confirm your exact time by email."
       );
+      idempotencyKey.current = null;
       setForm({
         name: "",
         email: "",
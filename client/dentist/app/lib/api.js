@@ -111,7 +111,11 @@ export const authAPI = {
 
 // Users
 export const userAPI = {
-  getAll: () => apiRequest('/api/users'),
+  // filters: { q, match: 'contains' | 'prefix', status, is_verified, limit, cursor }
+  getAll: (filters = {}) => {
+    const params = new URLSearchParams(filters).toString();
+    return apiRequest(`/api/users${params ? `?${params}` : ''}`);
+  },
   updateRole: (userId, role) =>
     apiRequest(`/api/users/${userId}/role`, { method: 'PATCH', body: JSON.stringify({ role }) }),
   updateProfile: (data) =>
@@ -1,16 +1,45 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, redirect, Response, stream_with_context, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate, upgrade as migrate_upgrade, stamp as migrate_stamp
 from flask_cors import CORS
 from flask_mail import Mail, Message
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 import os
+import json
+import base64
 import random
 import string
+import time
+import hashlib
+import io
+import re
+import stat
+import tempfile
+import mimetypes
+from urllib.parse import quote
 from datetime import datetime, UTC, timedelta
 from functools import wraps
+from contextlib import contextmanager
+from collections import OrderedDict
+from bisect import bisect_left, insort
+from itertools import accumulate
+import threading
+import atexit
+import multiprocessing
+from zoneinfo import ZoneInfo
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dotenv import load_dotenv
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
+from werkzeug.http import is_resource_modified
+from sqlalchemy import func, case, and_, or_, select, update, delete, insert, literal, tuple_, bindparam, cast, exists
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, OperationalError, TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import validates, aliased, joinedload, lazyload
+import click
 
 load_dotenv()
 
@@ -37,9 +66,9 @@ def handle_options():
 CORS(app, 
      origins=["http://localhost:3000", "http://127.0.0.1:3000"],
      supports_credentials=True,
-     allow_headers=["Content-Type", "Authorization"],
+     allow_headers=["Content-Type", "Authorization", "Idempotency-Key"],
      methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
-     expose_headers=["Content-Type", "Authorization"])
+     expose_headers=["Content-Type", "Authorization", "Server-Timing", "Idempotent-Replayed", "Retry-After"])
 
 # Enable automatic OPTIONS response
 @app.before_request
@@ -66,14 +95,115 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+
+class PoolStats:
+    """Cumulative connection checkout counters for this process."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait_ms, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_ms_total': round(self.wait_ms_total, 2),
+                'wait_ms_avg': round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_ms_max': round(self.wait_ms_max, 2)
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits (including pre-ping)."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except SQLAlchemyTimeoutError:
+            pool_stats.record((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        wait_ms = (time.perf_counter() - started) * 1000
+        pool_stats.record(wait_ms)
+        if has_request_context() and 'pool_wait_ms' in g:
+            g.pool_wait_ms += wait_ms
+        return connection
+
+
+# Connection pool per process; gunicorn.conf.py sizes it from the worker model.
+# DB_PGBOUNCER=true targets PgBouncer in transaction-pooling mode, where a
+# server-side prepared statement can land on a different backend.
+database_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['DB_PGBOUNCER'] = os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true'
+if database_url.get_backend_name() != 'sqlite':
+    engine_options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    if app.config['DB_PGBOUNCER'] and database_url.get_driver_name() == 'psycopg':
+        # psycopg 3 prepares repeated statements server-side; psycopg2 never does
+        engine_options['connect_args'] = {'prepare_threshold': None}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
 mail_port_env = os.environ.get('MAIL_PORT')
 app.config['MAIL_PORT'] = int(mail_port_env) if mail_port_env and mail_port_env.strip() else 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', os.environ.get('MAIL_USERNAME'))
 
+# Email outbox delivery (see EMAIL OUTBOX below)
+app.config['EMAIL_BATCH_SIZE'] = int(os.environ.get('EMAIL_BATCH_SIZE', 50))
+app.config['EMAIL_POLL_SECONDS'] = float(os.environ.get('EMAIL_POLL_SECONDS', 5))
+app.config['EMAIL_MAX_ATTEMPTS'] = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+app.config['EMAIL_RETRY_BASE_SECONDS'] = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', 30))
+
+# Clinic opening hours used by the time-slot availability engine
+app.config['CLINIC_OPEN_TIME'] = os.environ.get('CLINIC_OPEN_TIME', '09:00')
+app.config['CLINIC_CLOSE_TIME'] = os.environ.get('CLINIC_CLOSE_TIME', '17:00')
+app.config['CLINIC_OPEN_DAYS'] = os.environ.get('CLINIC_OPEN_DAYS', 'mon,tue,wed,thu,fri,sat')
+app.config['CLINIC_TIMEZONE'] = os.environ.get('CLINIC_TIMEZONE', 'UTC')
+# Appointments that can run at the same time (chairs / dentists on shift)
+app.config['CLINIC_CAPACITY'] = int(os.environ.get('CLINIC_CAPACITY', 1))
+app.config['SLOT_GRANULARITY_MINUTES'] = int(os.environ.get('SLOT_GRANULARITY_MINUTES', 15))
+app.config['DEFAULT_SERVICE_MINUTES'] = int(os.environ.get('DEFAULT_SERVICE_MINUTES', 30))
+app.config['MAX_AVAILABILITY_DAYS'] = int(os.environ.get('MAX_AVAILABILITY_DAYS', 31))
+# Slot reservations retry unique violations, serialization failures and deadlocks
+app.config['RESERVATION_RETRIES'] = int(os.environ.get('RESERVATION_RETRIES', 5))
+app.config['RESERVATION_RETRY_BASE_MS'] = float(os.environ.get('RESERVATION_RETRY_BASE_MS', 20))
+# Idempotency-Key support for public POST endpoints
+app.config['IDEMPOTENCY_TTL_SECONDS'] = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
+# How long a duplicate waits for the first request before answering 409
+app.config['IDEMPOTENCY_WAIT_SECONDS'] = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 5))
+# An in-progress claim older than this is assumed abandoned and may be taken over
+app.config['IDEMPOTENCY_LOCK_SECONDS'] = float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
+app.config['IDEMPOTENCY_PURGE_SECONDS'] = float(os.environ.get('IDEMPOTENCY_PURGE_SECONDS', 300))
+# Largest item list accepted by PATCH /api/bookings/bulk-status
+app.config['BULK_BOOKINGS_MAX'] = int(os.environ.get('BULK_BOOKINGS_MAX', 200))
+# Days of dentist appointment intervals each worker keeps in memory
+app.config['CALENDAR_INDEX_DAYS'] = int(os.environ.get('CALENDAR_INDEX_DAYS', 120))
+
 # File Upload Configuration
 UPLOAD_FOLDER = 'uploads/content'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -81,6 +211,86 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# Resized WebP/AVIF derivatives of content images (see IMAGE DERIVATIVES below)
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+app.config['IMAGE_VARIANT_WIDTHS'] = [int(w) for w in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,960,1280,1920').split(',') if w.strip()]
+app.config['IMAGE_VARIANT_FORMATS'] = [f.strip() for f in os.environ.get('IMAGE_VARIANT_FORMATS', 'avif,webp').split(',') if f.strip()]
+app.config['IMAGE_WEBP_QUALITY'] = int(os.environ.get('IMAGE_WEBP_QUALITY', 80))
+app.config['IMAGE_AVIF_QUALITY'] = int(os.environ.get('IMAGE_AVIF_QUALITY', 55))
+# Cache-Control max-age for content-hashed uploads, which never change
+app.config['IMMUTABLE_MAX_AGE'] = int(os.environ.get('IMMUTABLE_MAX_AGE', 365 * 24 * 3600))
+# ...and for other uploads (dentist photos, files from before content hashing)
+app.config['UPLOAD_CACHE_MAX_AGE'] = int(os.environ.get('UPLOAD_CACHE_MAX_AGE', 3600))
+
+# Media store garbage collection (see MEDIA STORE below). Unreferenced blobs
+# younger than the grace period are kept, which covers in-flight uploads
+app.config['MEDIA_GC_INTERVAL_SECONDS'] = float(os.environ.get('MEDIA_GC_INTERVAL_SECONDS', 600))
+app.config['MEDIA_GC_GRACE_SECONDS'] = float(os.environ.get('MEDIA_GC_GRACE_SECONDS', 3600))
+app.config['MEDIA_GC_BATCH'] = int(os.environ.get('MEDIA_GC_BATCH', 500))
+
+# /uploads serving (see UPLOAD SERVING below). UPLOAD_OFFLOAD hands the file
+# to the front server: x-accel (nginx, served from UPLOAD_ACCEL_PREFIX,
+# an internal location aliased to UPLOADS_ROOT) or x-sendfile
+app.config['UPLOADS_ROOT'] = os.path.abspath(os.environ.get('UPLOADS_ROOT', 'uploads'))
+app.config['UPLOAD_OFFLOAD'] = os.environ.get('UPLOAD_OFFLOAD', '').lower()
+if app.config['UPLOAD_OFFLOAD'] not in ('', 'x-accel', 'x-sendfile'):
+    raise RuntimeError("UPLOAD_OFFLOAD must be empty, 'x-accel' or 'x-sendfile'")
+app.config['UPLOAD_ACCEL_PREFIX'] = os.environ.get('UPLOAD_ACCEL_PREFIX', '/internal-uploads/')
+app.config['UPLOAD_STAT_CACHE_SECONDS'] = float(os.environ.get('UPLOAD_STAT_CACHE_SECONDS', 10))
+app.config['UPLOAD_STAT_CACHE_SIZE'] = int(os.environ.get('UPLOAD_STAT_CACHE_SIZE', 10000))
+
+# Where uploads are stored (see STORAGE BACKENDS below): local (UPLOADS_ROOT)
+# or s3 (any S3-compatible service, e.g. MinIO), which API replicas can share
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local').lower()
+if app.config['STORAGE_BACKEND'] not in ('local', 's3'):
+    raise RuntimeError("STORAGE_BACKEND must be 'local' or 's3'")
+app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET')
+if app.config['STORAGE_BACKEND'] == 's3' and not app.config['S3_BUCKET']:
+    raise RuntimeError('S3_BUCKET is required when STORAGE_BACKEND=s3')
+app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL') or None
+app.config['S3_REGION'] = os.environ.get('S3_REGION') or None
+app.config['S3_ACCESS_KEY_ID'] = os.environ.get('S3_ACCESS_KEY_ID') or None
+app.config['S3_SECRET_ACCESS_KEY'] = os.environ.get('S3_SECRET_ACCESS_KEY') or None
+# Public base URL of the bucket (CDN or anonymous-read bucket); without it
+# /uploads redirects to presigned URLs valid for S3_PRESIGN_SECONDS
+app.config['S3_PUBLIC_URL'] = os.environ.get('S3_PUBLIC_URL') or None
+app.config['S3_PRESIGN_SECONDS'] = int(os.environ.get('S3_PRESIGN_SECONDS', 3600))
+app.config['S3_MAX_POOL_CONNECTIONS'] = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 20))
+app.config['S3_MULTIPART_THRESHOLD'] = int(os.environ.get('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+app.config['S3_MULTIPART_CHUNKSIZE'] = int(os.environ.get('S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+app.config['S3_MAX_CONCURRENCY'] = int(os.environ.get('S3_MAX_CONCURRENCY', 4))
+
+# Request instrumentation thresholds (see REQUEST INSTRUMENTATION below)
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 100))
+app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 500))
+app.config['SLOW_REQUEST_QUERIES'] = int(os.environ.get('SLOW_REQUEST_QUERIES', 20))
+app.config['LOG_ALL_REQUESTS'] = os.environ.get('LOG_ALL_REQUESTS', 'false').lower() == 'true'
+
+# Cache of auth-relevant user fields checked by token_required. Role and
+# password changes bump the auth_users cache version, so other workers drop
+# their entries within CACHE_VERSION_POLL_SECONDS rather than the full TTL.
+app.config['AUTH_CACHE_TTL'] = float(os.environ.get('AUTH_CACHE_TTL', 30))
+app.config['AUTH_CACHE_SIZE'] = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+
+# Password hashing pool, one per process; KDF_WORKERS=0 hashes inline on the
+# request thread. gunicorn.conf.py divides the CPUs between its workers
+app.config['KDF_WORKERS'] = int(os.environ.get('KDF_WORKERS', min(4, os.cpu_count() or 1)))
+app.config['KDF_MAX_PENDING'] = int(os.environ.get('KDF_MAX_PENDING', app.config['KDF_WORKERS'] * 4))
+app.config['KDF_TIMEOUT'] = float(os.environ.get('KDF_TIMEOUT', 10))
+app.config['KDF_RETRY_AFTER'] = int(os.environ.get('KDF_RETRY_AFTER', 2))
+
+# Write-behind buffer for users.last_login (see LAST LOGIN WRITE-BEHIND below)
+app.config['LAST_LOGIN_FLUSH_SECONDS'] = float(os.environ.get('LAST_LOGIN_FLUSH_SECONDS', 5))
+app.config['LAST_LOGIN_MAX_PENDING'] = int(os.environ.get('LAST_LOGIN_MAX_PENDING', 1000))
+
+# Cache-Control max-age for public read endpoints (browsers and CDNs)
+app.config['PUBLIC_CACHE_MAX_AGE'] = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', 60))
+# How often each worker re-reads cache_versions to pick up other workers' writes
+app.config['CACHE_VERSION_POLL_SECONDS'] = float(os.environ.get('CACHE_VERSION_POLL_SECONDS', 2))
+# Cached public responses per worker; variants come from query strings, so keep it bounded
+app.config['PUBLIC_CACHE_SIZE'] = int(os.environ.get('PUBLIC_CACHE_SIZE', 256))
+
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('uploads/cars', exist_ok=True)
 
@@ -88,6 +298,7 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 db = SQLAlchemy(app)
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
 mail = Mail(app)
 
 # ============================================================================
@@ -107,10 +318,24 @@ class User(db.Model):
     code_expires_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
+    # Bumped to revoke every JWT issued before a password change
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     bookings = db.relationship('Booking', backref='user', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Keyset pagination for /api/users filtered by status
+        db.Index('ix_users_status_id', 'status', 'id'),
+        # Name/email search with ILIKE; trigram GIN indexes on Postgres
+        # serve both prefix and substring patterns (see 0010_user_search).
+        # Other databases have no index type for that, so none is created
+        db.Index('ix_users_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_users_email_trgm', 'email', postgresql_using='gin',
+                 postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -136,7 +361,8 @@ class Service(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    bookings = db.relationship('Booking', backref='service', lazy=True)
+    # Booking.to_dict() always reads service.name, so load it in the same SELECT
+    bookings = db.relationship('Booking', backref=db.backref('service', lazy='joined'), lazy=True)
 
     def to_dict(self):
         return {
@@ -151,6 +377,51 @@ class Service(db.Model):
         }
 
 
+dentist_services = db.Table(
+    'dentist_services',
+    db.Column('dentist_id', db.Integer, db.ForeignKey('dentists.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('service_id', db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), primary_key=True)
+)
+
+
+class Dentist(db.Model):
+    __tablename__ = 'dentists'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    specialty = db.Column(db.String(120), nullable=True)
+    bio = db.Column(db.Text, nullable=True)
+    email = db.Column(db.String(120), nullable=True)
+    phone = db.Column(db.String(50), nullable=True)
+    photo_url = db.Column(db.String(500), nullable=True)
+    is_active = db.Column(db.Boolean, default=True, server_default='true')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Services this dentist performs; empty means any service
+    services = db.relationship('Service', secondary=dentist_services, lazy='selectin',
+                               backref=db.backref('dentists', lazy=True))
+    bookings = db.relationship('Booking', backref=db.backref('dentist', lazy='joined'), lazy=True)
+
+    def performs(self, service_id):
+        return not self.services or any(service.id == service_id for service in self.services)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'specialty': self.specialty,
+            'bio': self.bio,
+            'email': self.email,
+            'phone': self.phone,
+            'photo_url': media_public_url(self.photo_url),
+            'is_active': self.is_active,
+            'service_ids': [service.id for service in self.services],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
 class Booking(db.Model):
     __tablename__ = 'bookings'
 
@@ -162,14 +433,39 @@ class Booking(db.Model):
     customer_email = db.Column(db.String(120), nullable=False)
     customer_phone = db.Column(db.String(50), nullable=False)
     service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False, index=True)
+    dentist_id = db.Column(db.Integer, db.ForeignKey('dentists.id', ondelete='SET NULL', name='fk_bookings_dentist_id'), nullable=True)
     preferred_date = db.Column(db.Date, nullable=False)
     time_slot = db.Column(db.String(50), nullable=True) 
+    # Start of time_slot in minutes after midnight, kept in sync by _sync_slot_start()
+    slot_start = db.Column(db.Integer, nullable=True)
     status = db.Column(db.String(20), default='pending', server_default='pending')
     price = db.Column(db.Numeric(10, 2), nullable=True)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination for /api/bookings, with and without a status filter
+        db.Index('ix_bookings_created_at_id', 'created_at', 'id'),
+        db.Index('ix_bookings_status_created_at_id', 'status', 'created_at', 'id'),
+        # Availability lookups scan one date range for the slot-holding statuses
+        db.Index('ix_bookings_preferred_date_status', 'preferred_date', 'status'),
+        # Per-dentist day calendars and conflict checks
+        db.Index('ix_bookings_dentist_id_preferred_date', 'dentist_id', 'preferred_date'),
+        # At most one held booking per dentist, date and start time
+        db.Index(
+            'uq_bookings_dentist_slot_held', 'dentist_id', 'preferred_date', 'slot_start',
+            unique=True,
+            postgresql_where=db.text("status IN ('confirmed', 'completed') AND dentist_id IS NOT NULL"),
+            sqlite_where=db.text("status IN ('confirmed', 'completed') AND dentist_id IS NOT NULL")
+        ),
+    )
+
+    @validates('time_slot')
+    def _sync_slot_start(self, key, time_slot):
+        self.slot_start = parse_time_slot(time_slot)
+        return time_slot
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -179,6 +475,8 @@ class Booking(db.Model):
             'customer_phone': self.customer_phone,
             'service_id': self.service_id,
             'service_name': self.service.name if self.service else None,
+            'dentist_id': self.dentist_id,
+            'dentist_name': self.dentist.name if self.dentist else None,
             'preferred_date': self.preferred_date.isoformat() if self.preferred_date else None,
             'time_slot': self.time_slot,
             'status': self.status,
@@ -196,6 +494,7 @@ class ContentBlock(db.Model):
     title = db.Column(db.String(200), nullable=True)
     content = db.Column(db.Text, nullable=True)  # HTML or plain text content
     media_url = db.Column(db.String(500), nullable=True)  # Image/video URL
+    media_variants = db.Column(db.JSON, nullable=True)  # Resized derivatives of media_url, see build_image_variants
     updated_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -208,7 +507,8 @@ class ContentBlock(db.Model):
             'key': self.key,
             'title': self.title,
             'content': self.content,
-            'media_url': self.media_url,
+            'media_url': media_public_url(self.media_url),
+            'media_variants': self.media_variants,
             'updated_by': self.updated_by,
             'updated_by_name': self.updater.name if self.updater else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
@@ -216,6 +516,85 @@ class ContentBlock(db.Model):
         }
 
 
+class DailyStat(db.Model):
+    """Per-day rollup of bookings, revenue and registrations for the dashboard.
+
+    Booking rows are keyed by (day, service_id, status) where day is the
+    booking's created_at date. Registrations use service_id NULL and the
+    pseudo-status 'registered'.
+    """
+    __tablename__ = 'daily_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+    bookings_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')
+    registrations = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('uq_daily_stats_day_service_status', 'day', 'service_id', 'status',
+                 unique=True, postgresql_nulls_not_distinct=True),
+    )
+
+
+class CacheVersion(db.Model):
+    """Version counter per cached namespace, bumped by writers and polled by every worker."""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class EmailOutbox(db.Model):
+    """Outgoing email written in the same transaction as the change it reports."""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', server_default='pending')  # pending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header."""
+    __tablename__ = 'idempotency_keys'
+
+    scope = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='in_progress', server_default='in_progress')  # in_progress, completed
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class MediaBlob(db.Model):
+    """A file in the content-addressed media store (see MEDIA STORE)."""
+    __tablename__ = 'media_blobs'
+
+    url = db.Column(db.String(500), primary_key=True)  # /uploads/content/<sha256 prefix>.<ext>
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    parent_url = db.Column(db.String(500), nullable=True, index=True)  # Source image of a derivative
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, nullable=False, index=True)  # Last upload of this content
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -224,13 +603,19 @@ def generate_verification_code():
     """Generate a 6-digit verification code"""
     return ''.join(random.choices(string.digits, k=6))
 
-def send_verification_email(email, code, name):
-    """Send verification code via email"""
-    try:
-        msg = Message(
-            subject='Verify Your Email Address',
-            recipients=[email],
-            html=f"""
+def queue_email(recipient, subject, html):
+    """Add an email to the outbox; it is sent once the caller's transaction commits."""
+    email = EmailOutbox(recipient=recipient, subject=subject, html=html)
+    db.session.add(email)
+    return email
+
+
+def queue_verification_email(email, code, name):
+    """Queue the verification code email in the current transaction"""
+    queue_email(
+        recipient=email,
+        subject='Verify Your Email Address',
+        html=f"""
             <!DOCTYPE html>
             <html>
             <head>
@@ -267,21 +652,15 @@ def send_verification_email(email, code, name):
             </body>
             </html>
             """
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"❌ Email Error: {str(e)}")
-        return False
+    )
 
 
-def send_booking_request_email(booking: 'Booking'):
-    """Notify customer that their booking request is received (pending)."""
-    try:
-        msg = Message(
-            subject="We received your appointment request",
-            recipients=[booking.customer_email],
-            html=f"""
+def queue_booking_request_email(booking: 'Booking'):
+    """Queue the notice that a booking request was received (pending)."""
+    queue_email(
+        recipient=booking.customer_email,
+        subject="We received your appointment request",
+        html=f"""
             <h2>Hi {booking.customer_name},</h2>
             <p>Thank you for booking an appointment with our clinic.</p>
             <p><strong>Status:</strong> Pending</p>
@@ -289,47 +668,451 @@ def send_booking_request_email(booking: 'Booking'):
             <p><strong>Preferred date:</strong> {booking.preferred_date}</p>
             <p>We will review your request and send you another email once it is confirmed with an exact time slot.</p>
             """
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"❌ Booking Request Email Error: {str(e)}")
-        return False
+    )
 
 
-def send_booking_status_email(booking: 'Booking'):
-    """Notify customer when booking is confirmed or cancelled, including time slot if confirmed."""
-    try:
-        subject = "Your appointment has been updated"
-        if booking.status == 'confirmed':
-            subject = "Your appointment is confirmed"
-        elif booking.status == 'cancelled':
-            subject = "Your appointment has been cancelled"
-
-        time_info = f"<p><strong>Time slot:</strong> {booking.time_slot}</p>" if booking.time_slot else ""
-
-        msg = Message(
-            subject=subject,
-            recipients=[booking.customer_email],
-            html=f"""
+def queue_booking_status_email(booking: 'Booking'):
+    """Queue the notice that a booking was confirmed or cancelled, including time slot if confirmed."""
+    subject = "Your appointment has been updated"
+    if booking.status == 'confirmed':
+        subject = "Your appointment is confirmed"
+    elif booking.status == 'cancelled':
+        subject = "Your appointment has been cancelled"
+
+    time_info = f"<p><strong>Time slot:</strong> {booking.time_slot}</p>" if booking.time_slot else ""
+
+    queue_email(
+        recipient=booking.customer_email,
+        subject=subject,
+        html=f"""
             <h2>Hi {booking.customer_name},</h2>
             <p>Your booking status has been updated to: <strong>{booking.status.title()}</strong></p>
             <p><strong>Service:</strong> {booking.service.name if booking.service else ''}</p>
             <p><strong>Date:</strong> {booking.preferred_date}</p>
             {time_info}
             """
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"❌ Booking Status Email Error: {str(e)}")
-        return False
+    )
+
+REGISTRATION_STAT_STATUS = 'registered'
+
+
+def bump_daily_stat(day, service_id, status, bookings_count=0, revenue=0, registrations=0):
+    """Apply a delta to one daily_stats row inside the caller's transaction."""
+    key_filter = and_(
+        DailyStat.day == day,
+        DailyStat.service_id.is_(None) if service_id is None else DailyStat.service_id == service_id,
+        DailyStat.status == status
+    )
+    stmt = update(DailyStat).where(key_filter).values(
+        bookings_count=DailyStat.bookings_count + bookings_count,
+        revenue=DailyStat.revenue + revenue,
+        registrations=DailyStat.registrations + registrations
+    ).execution_options(synchronize_session=False)
+
+    if db.session.execute(stmt).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(DailyStat(
+                day=day,
+                service_id=service_id,
+                status=status,
+                bookings_count=bookings_count,
+                revenue=revenue,
+                registrations=registrations
+            ))
+    except IntegrityError:
+        # Another transaction created the row first; apply the delta to it
+        db.session.execute(stmt)
+
+
+def record_booking_stat(booking, status=None, sign=1):
+    """Add (sign=1) or remove (sign=-1) a booking from the rollup under the given status."""
+    created_at = booking.created_at or datetime.utcnow()
+    bump_daily_stat(
+        created_at.date(),
+        booking.service_id,
+        status or booking.status,
+        bookings_count=sign,
+        revenue=sign * (booking.price or 0)
+    )
+
+
+def add_booking_stat_delta(deltas, booking, status=None, sign=1):
+    """Accumulate what record_booking_stat() would write, keyed by rollup row."""
+    created_at = booking.created_at or datetime.utcnow()
+    key = (created_at.date(), booking.service_id, status or booking.status)
+    count, revenue = deltas.get(key, (0, 0))
+    deltas[key] = (count + sign, revenue + sign * (booking.price or 0))
+
+
+def apply_booking_stat_deltas(deltas):
+    """Write accumulated deltas, one statement per changed rollup row, in a stable lock order."""
+    for (day, service_id, status), (count, revenue) in sorted(
+        deltas.items(), key=lambda item: (item[0][0], item[0][1] or 0, item[0][2])
+    ):
+        if count or revenue:
+            bump_daily_stat(day, service_id, status, bookings_count=count, revenue=revenue)
+
+
+def record_registration_stat(user):
+    """Count a newly created user in the rollup."""
+    created_at = user.created_at or datetime.utcnow()
+    bump_daily_stat(created_at.date(), None, REGISTRATION_STAT_STATUS, registrations=1)
+
+
+def count_where(condition):
+    """COUNT(*) FILTER (WHERE ...) on Postgres, portable SUM(CASE ...) elsewhere."""
+    if db.engine.dialect.name == 'postgresql':
+        return func.count().filter(condition)
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def sum_where(column, condition):
+    """SUM(column) FILTER (WHERE ...) on Postgres, portable SUM(CASE ...) elsewhere."""
+    if db.engine.dialect.name == 'postgresql':
+        return func.coalesce(func.sum(column).filter(condition), 0)
+    return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+
+def rebuild_daily_stats(since=None):
+    """Recompute daily_stats from bookings and users, optionally only from a given day on."""
+    delete_stmt = delete(DailyStat)
+    if since:
+        delete_stmt = delete_stmt.where(DailyStat.day >= since)
+    db.session.execute(delete_stmt)
+
+    booking_day = func.date(Booking.created_at)
+    bookings_select = select(
+        booking_day,
+        Booking.service_id,
+        Booking.status,
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.price), 0),
+        literal(0)
+    ).group_by(booking_day, Booking.service_id, Booking.status)
+
+    user_day = func.date(User.created_at)
+    users_select = select(
+        user_day,
+        literal(None, type_=db.Integer),
+        literal(REGISTRATION_STAT_STATUS),
+        literal(0),
+        literal(0),
+        func.count(User.id)
+    ).where(User.created_at.isnot(None)).group_by(user_day)
+
+    if since:
+        start = datetime.combine(since, datetime.min.time())
+        bookings_select = bookings_select.where(Booking.created_at >= start)
+        users_select = users_select.where(User.created_at >= start)
+
+    columns = ['day', 'service_id', 'status', 'bookings_count', 'revenue', 'registrations']
+    db.session.execute(insert(DailyStat).from_select(columns, bookings_select))
+    db.session.execute(insert(DailyStat).from_select(columns, users_select))
+    db.session.commit()
+
+
+@app.cli.command('rebuild-daily-stats')
+@click.option('--since', default=None, help='Only rebuild days on or after this ISO date (YYYY-MM-DD).')
+def rebuild_daily_stats_command(since):
+    """Backfill or rebuild the daily_stats rollup from bookings and users."""
+    since_day = datetime.fromisoformat(since).date() if since else None
+    rebuild_daily_stats(since_day)
+    print(f"✅ daily_stats rebuilt{f' from {since_day}' if since_day else ''}")
+
+
+def bump_cache_version(name):
+    """Bump a cache namespace version inside the caller's transaction; returns the new version."""
+    stmt = update(CacheVersion).where(CacheVersion.name == name).values(
+        version=CacheVersion.version + 1,
+        updated_at=datetime.utcnow()
+    ).returning(CacheVersion.version).execution_options(synchronize_session=False)
+
+    version = db.session.execute(stmt).scalar()
+    if version is not None:
+        return version
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(CacheVersion(name=name, version=1))
+        return 1
+    except IntegrityError:
+        return db.session.execute(stmt).scalar()
+
+
+class PublicResponseCache:
+    """
+    Read-through cache of pre-serialized public JSON responses.
+
+    Entries are tagged with their namespace version from cache_versions.
+    Each worker re-reads that version at most once per poll interval, so a
+    write made by any worker is picked up everywhere within that bound.
+    The version's bump time also feeds Last-Modified, so deleting a row
+    still moves it forward. Variants come from caller-supplied query
+    strings, so at most maxsize entries are kept, least recently used
+    first out.
+    """
+
+    def __init__(self, poll_seconds, maxsize):
+        self.poll_seconds = poll_seconds
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _version_info(self, namespace):
+        """Return (version, bumped_at) of a namespace, polled at most once per interval."""
+        with self._lock:
+            known = self._versions.get(namespace)
+        if known and time.monotonic() - known[2] < self.poll_seconds:
+            return known[0], known[1]
+
+        row = db.session.query(CacheVersion.version, CacheVersion.updated_at).filter(
+            CacheVersion.name == namespace
+        ).first()
+        version, bumped_at = (row.version, row.updated_at) if row else (0, None)
+        with self._lock:
+            self._versions[namespace] = (version, bumped_at, time.monotonic())
+        return version, bumped_at
+
+    def current_version(self, namespace):
+        return self._version_info(namespace)[0]
+
+    def get(self, namespace, variant, build_payload):
+        """Return (body, etag, last_modified), building and storing it on a miss."""
+        version, bumped_at = self._version_info(namespace)
+        key = (namespace, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        payload, last_modified = build_payload()
+        if bumped_at and (last_modified is None or bumped_at > last_modified):
+            last_modified = bumped_at
+        body = app.json.dumps(payload).encode()
+        cached = (body, hashlib.sha1(body).hexdigest(), last_modified)
+        with self._lock:
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, namespace):
+        """Drop local entries and force a version re-read on the next get."""
+        with self._lock:
+            self._versions.pop(namespace, None)
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+
+public_cache = PublicResponseCache(app.config['CACHE_VERSION_POLL_SECONDS'], app.config['PUBLIC_CACHE_SIZE'])
+
+
+def cached_json_response(namespace, variant, build_payload):
+    """
+    Serve a cached public JSON payload with ETag/Last-Modified validators.
+
+    build_payload returns (payload, last_modified) and only runs on a cache
+    miss. Clients holding the current validator get a 304 with no body.
+    """
+    body, etag, last_modified = public_cache.get(namespace, variant, build_payload)
+    last_modified = last_modified.replace(microsecond=0, tzinfo=UTC) if last_modified else None
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(last_modified and request.if_modified_since
+                            and last_modified <= request.if_modified_since)
+
+    response = Response(status=304) if not_modified else Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    max_age = app.config['PUBLIC_CACHE_MAX_AGE']
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, stale-while-revalidate={max_age * 5}'
+    return response
+
+
+AUTH_CACHE_NAMESPACE = 'auth_users'
+
+
+class AuthUserCache:
+    """
+    Thread-safe TTL + LRU cache of the user fields token_required checks.
+
+    Entries belong to one version of the auth_users cache namespace; when
+    another worker bumps it, sync() drops them all.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def sync(self, version):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, fields):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, fields)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+auth_user_cache = AuthUserCache(app.config['AUTH_CACHE_TTL'], app.config['AUTH_CACHE_SIZE'])
+
+
+class AuthUser:
+    """
+    Authenticated user built from cached auth fields.
+
+    Any other attribute (name, password, to_dict, ...) loads the full User
+    row on first use, so handlers can treat it like a User instance.
+    """
+    __slots__ = ('id', 'status', 'is_verified', 'token_version', '_user')
+
+    def __init__(self, id, status, is_verified, token_version):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'status', status)
+        object.__setattr__(self, 'is_verified', is_verified)
+        object.__setattr__(self, 'token_version', token_version)
+        object.__setattr__(self, '_user', None)
+
+    def _load(self):
+        if self._user is None:
+            object.__setattr__(self, '_user', db.session.get(User, self.id))
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        # Writes always go to the User row; cached fields are kept in step
+        setattr(self._load(), name, value)
+        if name in AuthUser.__slots__:
+            object.__setattr__(self, name, value)
+
+
+def load_auth_user(user_id):
+    """Return an AuthUser for user_id, hitting the database only on a cache miss."""
+    auth_user_cache.sync(public_cache.current_version(AUTH_CACHE_NAMESPACE))
+    fields = auth_user_cache.get(user_id)
+    if fields is None:
+        row = db.session.query(
+            User.id, User.status, User.is_verified, User.token_version
+        ).filter(User.id == user_id).first()
+        if not row:
+            return None
+        fields = tuple(row)
+        auth_user_cache.set(user_id, fields)
+    return AuthUser(*fields)
+
+
+class KdfBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class KdfPool:
+    """
+    Bounded process pool for password hashing and verification.
+
+    PBKDF2 is deliberately slow; running it in separate processes keeps a
+    login burst from starving other requests on the same worker. At most
+    max_pending hashes may be queued or running; beyond that callers get
+    KdfBusy immediately instead of waiting.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args, **kwargs):
+        if self.workers <= 0:
+            return fn(*args, **kwargs)
+
+        if not self._slots.acquire(blocking=False):
+            raise KdfBusy()
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+kdf_pool = KdfPool(app.config['KDF_WORKERS'], app.config['KDF_MAX_PENDING'], app.config['KDF_TIMEOUT'])
+atexit.register(kdf_pool.shutdown)
+
+
+def hash_password(password):
+    """Hash a password on the KDF pool (raises KdfBusy when saturated)."""
+    return kdf_pool.run(generate_password_hash, password, method='pbkdf2:sha256')
+
+
+def verify_password(password_hash, password):
+    """Check a password on the KDF pool (raises KdfBusy when saturated)."""
+    return kdf_pool.run(check_password_hash, password_hash, password)
+
+
+def kdf_busy_response():
+    """503 with Retry-After for requests rejected by the KDF pool."""
+    response = jsonify({'success': False, 'message': 'Server is busy, please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(app.config['KDF_RETRY_AFTER'])
+    return response
+
 
 def generate_token(user):
     """Generate JWT token"""
     payload = {
         'user_id': user.id,
         'status': user.status,
+        'ver': user.token_version or 0,
         'exp': datetime.utcnow() + timedelta(days=7),
         'iat': datetime.utcnow()
     }
@@ -353,11 +1136,14 @@ def token_required(f):
         
         try:
             payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(payload['user_id'])
+            current_user = load_auth_user(payload['user_id'])
             
             if not current_user:
                 return jsonify({'success': False, 'message': 'User not found'}), 401
             
+            if payload.get('ver', 0) != current_user.token_version:
+                return jsonify({'success': False, 'message': 'Token has been revoked'}), 401
+            
             if not current_user.is_verified:
                 return jsonify({'success': False, 'message': 'Email not verified'}), 403
                 
@@ -388,6 +1174,484 @@ def role_required(allowed_roles):
         return decorated
     return decorator
 
+def idempotency_request_hash():
+    """Fingerprint of the request body, insensitive to JSON key order and spacing."""
+    payload = request.get_json(silent=True)
+    raw = json.dumps(payload, sort_keys=True).encode() if payload is not None else request.get_data()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def claim_idempotency_key(scope, key, request_hash):
+    """
+    Claim (scope, key) for this request.
+
+    The claim row is inserted and committed before the work starts, so a
+    concurrent duplicate sees it at once and waits for the stored response
+    instead of running the work again. Returns one of:
+    ('claimed', locked_at), ('replay', row), ('mismatch', row) or
+    ('busy', row); locked_at identifies this claim to the later writes.
+    """
+    ttl = timedelta(seconds=app.config['IDEMPOTENCY_TTL_SECONDS'])
+    lock_timeout = timedelta(seconds=app.config['IDEMPOTENCY_LOCK_SECONDS'])
+    deadline = time.monotonic() + app.config['IDEMPOTENCY_WAIT_SECONDS']
+    delay = 0.05
+
+    while True:
+        now = datetime.utcnow()
+        try:
+            db.session.execute(insert(IdempotencyKey).values(
+                scope=scope, key=key, request_hash=request_hash, status='in_progress',
+                locked_at=now, created_at=now, expires_at=now + ttl
+            ))
+            db.session.commit()
+            return 'claimed', now
+        except IntegrityError:
+            db.session.rollback()
+
+        row = db.session.get(IdempotencyKey, (scope, key), populate_existing=True)
+        if row is None:
+            continue
+        if row.expires_at <= now:
+            db.session.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.expires_at <= now
+            ))
+            db.session.commit()
+            continue
+        if row.request_hash != request_hash:
+            return 'mismatch', row
+        if row.status == 'completed':
+            return 'replay', row
+
+        if row.locked_at <= now - lock_timeout:
+            # The first request died without finishing; take over its claim
+            taken = db.session.execute(update(IdempotencyKey).where(
+                IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+                IdempotencyKey.status == 'in_progress', IdempotencyKey.locked_at == row.locked_at
+            ).values(locked_at=now).execution_options(synchronize_session=False)).rowcount
+            db.session.commit()
+            if taken:
+                return 'claimed', now
+            continue
+
+        if time.monotonic() >= deadline:
+            return 'busy', row
+        db.session.rollback()
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+class IdempotencyClaimLost(Exception):
+    """Raised when another request took over this request's idempotency claim."""
+
+
+def idempotency_claim_target(scope, key, locked_at):
+    """WHERE clause matching a claim only while this request still holds it."""
+    return and_(IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+                IdempotencyKey.status == 'in_progress', IdempotencyKey.locked_at == locked_at)
+
+
+def record_idempotent_response(payload, status_code):
+    """
+    Store a view's response for replay inside the view's own transaction.
+
+    Call right before the commit that makes the view's write durable, so
+    the write and its stored response commit together: a worker dying
+    after that commit cannot lead a retry to run the write again. Raises
+    IdempotencyClaimLost (rolling back the write with it) if a stale-claim
+    takeover already handed the key to another request. Does nothing for
+    requests without an Idempotency-Key.
+    """
+    claim = g.get('idempotency_claim')
+    if claim is None:
+        return
+    recorded = db.session.execute(update(IdempotencyKey).where(idempotency_claim_target(*claim)).values(
+        status='completed',
+        response_status=status_code,
+        response_body=app.json.dumps(payload)
+    ).execution_options(synchronize_session=False)).rowcount
+    if not recorded:
+        raise IdempotencyClaimLost('Idempotency-Key was taken over by a retry of this request')
+
+
+def finish_idempotency_key(scope, key, locked_at, response):
+    """
+    Store the response for replay, or release the claim after a server error.
+
+    Responses already stored by record_idempotent_response, and claims
+    taken over by another request, are left alone.
+    """
+    target = idempotency_claim_target(scope, key, locked_at)
+    if response.status_code >= 500:
+        db.session.execute(delete(IdempotencyKey).where(target))
+    else:
+        db.session.execute(update(IdempotencyKey).where(target).values(
+            status='completed',
+            response_status=response.status_code,
+            response_body=response.get_data(as_text=True)
+        ).execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+class Throttle:
+    """Thread-safe gate that lets one caller through per interval_seconds."""
+
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self._last = None
+        self._lock = threading.Lock()
+
+    def ready(self):
+        """True (and restart the interval) if the interval has passed since the last True."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last is not None and now - self._last < self.interval_seconds:
+                return False
+            self._last = now
+            return True
+
+
+idempotency_purge_throttle = Throttle(app.config['IDEMPOTENCY_PURGE_SECONDS'])
+
+
+def purge_expired_idempotency_keys():
+    """Delete expired keys; returns the number of rows removed."""
+    removed = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return removed
+
+
+def idempotent(scope):
+    """
+    Decorator for POST endpoints that honours an Idempotency-Key header.
+
+    A retry with the same key and body replays the stored status and JSON
+    without running the view again (marked Idempotent-Replayed: true).
+    The same key with a different body is rejected with 422. Requests
+    without the header behave as before.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key', '').strip()
+            if not key:
+                return f(*args, **kwargs)
+            if len(key) > 255:
+                return jsonify({'success': False, 'message': 'Idempotency-Key must be at most 255 characters'}), 400
+
+            try:
+                outcome, claim = claim_idempotency_key(scope, key, idempotency_request_hash())
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Idempotency Claim Error: {str(e)}")
+                return jsonify({'success': False, 'message': 'Failed to process request'}), 500
+
+            if outcome == 'replay':
+                response = Response(claim.response_body, status=claim.response_status, mimetype='application/json')
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            if outcome == 'mismatch':
+                return jsonify({
+                    'success': False,
+                    'message': 'Idempotency-Key was already used with a different request'
+                }), 422
+            if outcome == 'busy':
+                response = jsonify({
+                    'success': False,
+                    'message': 'A request with this Idempotency-Key is still being processed'
+                })
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+
+            g.idempotency_claim = (scope, key, claim)
+            response = app.make_response(f(*args, **kwargs))
+            try:
+                finish_idempotency_key(scope, key, claim, response)
+                if idempotency_purge_throttle.ready():
+                    purge_expired_idempotency_keys()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Idempotency Store Error: {str(e)}")
+            return response
+        return decorated
+    return decorator
+
+
+@app.cli.command('purge-idempotency-keys')
+def purge_idempotency_keys_command():
+    """Delete expired idempotency keys."""
+    print(f"🧹 Removed {purge_expired_idempotency_keys()} expired idempotency key(s)")
+
+# ============================================================================
+# REQUEST INSTRUMENTATION
+# ============================================================================
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started_at', []).append((statement, time.perf_counter()))
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['query_started_at'].pop()[1]) * 1000
+
+    if elapsed_ms >= app.config['SLOW_QUERY_MS']:
+        print(json.dumps({
+            'event': 'slow_query',
+            'path': request.path if has_request_context() else None,
+            'duration_ms': round(elapsed_ms, 2),
+            'statement': ' '.join(statement.split())[:500]
+        }))
+
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_time_ms += elapsed_ms
+        if elapsed_ms > g.sql_slowest_ms:
+            g.sql_slowest_ms = elapsed_ms
+            g.sql_slowest = statement
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time so it does not skew the next statement on this connection
+    if context.connection is not None:
+        started = context.connection.info.get('query_started_at')
+        if started and started[-1][0] == context.statement:
+            started.pop()
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started_at = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time_ms = 0.0
+    g.sql_slowest_ms = 0.0
+    g.sql_slowest = None
+    g.pool_wait_ms = 0.0
+
+
+@app.after_request
+def emit_request_metrics(response):
+    """Expose per-request SQL metrics as Server-Timing and log slow requests."""
+    if 'request_started_at' not in g:
+        return response
+
+    total_ms = (time.perf_counter() - g.request_started_at) * 1000
+    # Headers of a streamed response go out before its queries run, so the
+    # numbers would only cover the setup; leave Server-Timing off entirely
+    if not response.is_streamed:
+        response.headers.add('Server-Timing', f'db;dur={g.sql_time_ms:.2f};desc="{g.sql_count} queries"')
+        response.headers.add('Server-Timing', f'db-slowest;dur={g.sql_slowest_ms:.2f}')
+        response.headers.add('Server-Timing', f'db-pool;dur={g.pool_wait_ms:.2f}')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+
+    slow = (total_ms >= app.config['SLOW_REQUEST_MS']
+            or g.sql_count >= app.config['SLOW_REQUEST_QUERIES'])
+    if slow or app.config['LOG_ALL_REQUESTS']:
+        print(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'sql_count': g.sql_count,
+            'sql_time_ms': round(g.sql_time_ms, 2),
+            'sql_slowest_ms': round(g.sql_slowest_ms, 2),
+            'sql_slowest': ' '.join(g.sql_slowest.split())[:500] if g.sql_slowest else None,
+            'pool_wait_ms': round(g.pool_wait_ms, 2),
+            'streamed': response.is_streamed,
+            'slow': slow
+        }))
+
+    return response
+
+# ============================================================================
+# EMAIL OUTBOX
+# ============================================================================
+
+def email_retry_delay(attempts):
+    """Exponential backoff between delivery attempts, capped at one hour."""
+    return timedelta(seconds=min(app.config['EMAIL_RETRY_BASE_SECONDS'] * 2 ** (attempts - 1), 3600))
+
+
+def deliver_outbox_batch(batch_size=None):
+    """
+    Send one batch of due outbox emails over a single SMTP connection.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED on Postgres so several
+    workers can drain the outbox without sending the same email twice.
+    Returns the number of emails processed.
+    """
+    now = datetime.utcnow()
+    emails = EmailOutbox.query.filter(
+        EmailOutbox.status == 'pending',
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(EmailOutbox.id).limit(
+        batch_size or app.config['EMAIL_BATCH_SIZE']
+    ).with_for_update(skip_locked=True).all()
+
+    if not emails:
+        db.session.rollback()
+        return 0
+
+    def record_failure(email, error):
+        email.attempts += 1
+        email.last_error = str(error)[:1000]
+        if email.attempts >= app.config['EMAIL_MAX_ATTEMPTS']:
+            email.status = 'failed'
+            print(f"❌ Email {email.id} to {email.recipient} failed permanently: {error}")
+        else:
+            email.next_attempt_at = now + email_retry_delay(email.attempts)
+
+    try:
+        with mail.connect() as connection:
+            for email in emails:
+                try:
+                    connection.send(Message(subject=email.subject, recipients=[email.recipient], html=email.html))
+                    email.status = 'sent'
+                    email.sent_at = datetime.utcnow()
+                    email.last_error = None
+                except Exception as e:
+                    record_failure(email, e)
+    except Exception as e:
+        # Could not open (or lost) the SMTP connection; retry whatever was not sent
+        print(f"❌ SMTP Connection Error: {str(e)}")
+        for email in emails:
+            if email.status == 'pending':
+                record_failure(email, e)
+
+    db.session.commit()
+    return len(emails)
+
+
+def run_email_worker(stop_event=None):
+    """Drain the outbox until stop_event is set, sleeping when it is empty."""
+    stop_event = stop_event or threading.Event()
+    print("📨 Email outbox worker started")
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                processed = deliver_outbox_batch()
+        except Exception as e:
+            print(f"❌ Email Worker Error: {str(e)}")
+            processed = 0
+        if not processed:
+            stop_event.wait(app.config['EMAIL_POLL_SECONDS'])
+
+
+@app.cli.command('email-worker')
+@click.option('--once', is_flag=True, help='Send a single batch and exit.')
+def email_worker_command(once):
+    """Deliver queued emails from the outbox."""
+    if once:
+        print(f"📨 Processed {deliver_outbox_batch()} email(s)")
+        return
+    run_email_worker()
+
+# ============================================================================
+# LAST LOGIN WRITE-BEHIND
+# ============================================================================
+
+class LastLoginBuffer:
+    """
+    Collects last-login timestamps in memory and writes them in bulk.
+
+    Logins only record (user_id, timestamp) here; a background thread
+    flushes the buffer every LAST_LOGIN_FLUSH_SECONDS (sooner once
+    LAST_LOGIN_MAX_PENDING users are waiting) as one executemany UPDATE.
+    Only the newest timestamp per user is kept, and the UPDATE never moves
+    last_login backwards, so flushes from several workers can interleave.
+    """
+
+    def __init__(self, flush_seconds, max_pending):
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def record(self, user_id, timestamp):
+        with self._lock:
+            current = self._pending.get(user_id)
+            if current is None or timestamp > current:
+                self._pending[user_id] = timestamp
+            size = len(self._pending)
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._wake = threading.Event()
+                threading.Thread(target=self._run, name='last-login-flush', daemon=True).start()
+        if size >= self.max_pending:
+            self._wake.set()
+
+    def pending(self, user_id):
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def _swap(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _restore(self, pending):
+        with self._lock:
+            for user_id, timestamp in pending.items():
+                current = self._pending.get(user_id)
+                if current is None or timestamp > current:
+                    self._pending[user_id] = timestamp
+
+    def flush(self):
+        """Write all buffered timestamps; returns the number of users flushed."""
+        pending = self._swap()
+        if not pending:
+            return 0
+
+        users = User.__table__
+        statement = users.update().where(
+            users.c.id == bindparam('b_user_id'),
+            or_(users.c.last_login.is_(None), users.c.last_login < bindparam('b_last_login'))
+        ).values(last_login=bindparam('b_last_login'))
+        params = [
+            {'b_user_id': user_id, 'b_last_login': timestamp}
+            for user_id, timestamp in sorted(pending.items())
+        ]
+
+        try:
+            with app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(statement, params)
+        except Exception:
+            self._restore(pending)
+            raise
+        return len(pending)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Last Login Flush Error: {str(e)}")
+
+
+last_login_buffer = LastLoginBuffer(app.config['LAST_LOGIN_FLUSH_SECONDS'], app.config['LAST_LOGIN_MAX_PENDING'])
+
+
+@atexit.register
+def flush_last_logins():
+    """Write out buffered last-login timestamps before the process exits."""
+    try:
+        flushed = last_login_buffer.flush()
+        if flushed:
+            print(f"🕒 Flushed last login for {flushed} user(s)")
+    except Exception as e:
+        print(f"❌ Last Login Flush Error: {str(e)}")
+
 # ============================================================================
 # PUBLIC ROUTES
 # ============================================================================
@@ -427,21 +1691,22 @@ def get_public_content():
     try:
         key_filter = request.args.get('key')
         
-        query = ContentBlock.query
-        if key_filter:
-            query = query.filter_by(key=key_filter)
-        
-        content_blocks = query.order_by(ContentBlock.key).all()
-        blocks_dict = {block.key: {
-            'title': block.title,
-            'content': block.content,
-            'media_url': block.media_url
-        } for block in content_blocks}
-        
-        return jsonify({
-            'success': True,
-            'content': blocks_dict
-        }), 200
+        def build_payload():
+            query = ContentBlock.query
+            if key_filter:
+                query = query.filter_by(key=key_filter)
+
+            content_blocks = query.order_by(ContentBlock.key).all()
+            blocks_dict = {block.key: {
+                'title': block.title,
+                'content': block.content,
+                'media_url': media_public_url(block.media_url),
+                **media_srcset(block.media_variants)
+            } for block in content_blocks}
+            last_modified = max((block.updated_at for block in content_blocks if block.updated_at), default=None)
+            return {'success': True, 'content': blocks_dict}, last_modified
+
+        return cached_json_response('content', key_filter, build_payload)
         
     except Exception as e:
         print(f"❌ Get Public Content Error: {str(e)}")
@@ -478,10 +1743,9 @@ def register():
             verification_code = generate_verification_code()
             existing_user.verification_code = verification_code
             existing_user.code_expires_at = datetime.utcnow() + timedelta(minutes=10)
+            queue_verification_email(email, verification_code, name)
             db.session.commit()
             
-            send_verification_email(email, verification_code, name)
-            
             return jsonify({
                 'success': True,
                 'message': 'Verification code sent to your email',
@@ -489,7 +1753,7 @@ def register():
             }), 200
         
         verification_code = generate_verification_code()
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        hashed_password = hash_password(password)
         
         new_user = User(
             name=name,
@@ -500,17 +1764,21 @@ def register():
         )
         
         db.session.add(new_user)
+        db.session.flush()
+        record_registration_stat(new_user)
+        queue_verification_email(email, verification_code, name)
         db.session.commit()
         
-        email_sent = send_verification_email(email, verification_code, name)
-        
         return jsonify({
             'success': True,
             'message': 'Registration successful. Verification code sent to your email.',
             'email': email,
-            'email_sent': email_sent
+            'email_sent': True
         }), 201
         
+    except KdfBusy:
+        db.session.rollback()
+        return kdf_busy_response()
     except Exception as e:
         db.session.rollback()
         print(f"❌ Register Error: {str(e)}")
@@ -549,7 +1817,9 @@ def verify_email():
         user.verification_code = None
         user.code_expires_at = None
         user.last_login = datetime.utcnow()
+        bump_cache_version(AUTH_CACHE_NAMESPACE)
         db.session.commit()
+        auth_user_cache.invalidate(user.id)
         
         token = generate_token(user)
         
@@ -590,14 +1860,10 @@ def resend_code():
         verification_code = generate_verification_code()
         user.verification_code = verification_code
         user.code_expires_at = datetime.utcnow() + timedelta(minutes=10)
+        queue_verification_email(email, verification_code, user.name)
         db.session.commit()
         
-        email_sent = send_verification_email(email, verification_code, user.name)
-        
-        if email_sent:
-            return jsonify({'success': True, 'message': 'Verification code sent successfully'}), 200
-        else:
-            return jsonify({'success': False, 'message': 'Failed to send email'}), 500
+        return jsonify({'success': True, 'message': 'Verification code sent successfully'}), 200
         
     except Exception as e:
         db.session.rollback()
@@ -621,7 +1887,7 @@ def login():
         
         user = User.query.filter_by(email=email).first()
         
-        if not user or not check_password_hash(user.password, password):
+        if not user or not verify_password(user.password, password):
             return jsonify({'success': False, 'message': 'Invalid email or password'}), 401
         
         if not user.is_verified:
@@ -631,18 +1897,23 @@ def login():
                 'email_verified': False
             }), 403
         
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Buffered and written in bulk by last_login_buffer, not on this request
+        login_time = datetime.utcnow()
+        last_login_buffer.record(user.id, login_time)
         
         token = generate_token(user)
+        user_data = user.to_dict()
+        user_data['last_login'] = login_time.isoformat()
         
         return jsonify({
             'success': True,
             'message': 'Login successful',
             'token': token,
-            'user': user.to_dict()
+            'user': user_data
         }), 200
         
+    except KdfBusy:
+        return kdf_busy_response()
     except Exception as e:
         print(f"❌ Login Error: {str(e)}")
         return jsonify({'success': False, 'message': 'Login failed'}), 500
@@ -656,13 +1927,18 @@ def login():
 def dashboard(current_user):
     """Get dashboard data - Protected route"""
     try:
+        total_users, verified_users = db.session.query(
+            func.count(User.id),
+            count_where(User.is_verified.is_(True))
+        ).one()
+
         return jsonify({
             'success': True,
             'message': 'Dashboard data retrieved successfully',
             'user': current_user.to_dict(),
             'stats': {
-                'total_users': User.query.count(),
-                'verified_users': User.query.filter_by(is_verified=True).count()
+                'total_users': total_users,
+                'verified_users': verified_users
             }
         }), 200
         
@@ -670,17 +1946,107 @@ def dashboard(current_user):
         print(f"❌ Dashboard Error: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to load dashboard'}), 500
 
-@app.route('/api/users', methods=['GET'])
-@role_required(['admin', 'moderator'])
-def get_users(current_user):
-    """Get all users - Protected route (admin/moderator only)"""
+@app.route('/api/system/db-pool', methods=['GET'])
+@role_required(['admin'])
+def db_pool_status(current_user):
+    """Live connection pool state and checkout wait statistics for this worker - Admin only"""
     try:
-        users = User.query.all()
-        users_list = [user.to_dict() for user in users]
-        
+        pool = db.engine.pool
+        status = {
+            'class': type(pool).__name__,
+            'pid': os.getpid(),
+            'pgbouncer_mode': app.config['DB_PGBOUNCER']
+        }
+        if isinstance(pool, QueuePool):
+            status.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'timeout': pool.timeout()
+            })
+        status.update(pool_stats.to_dict())
+
+        return jsonify({'success': True, 'pool': status}), 200
+
+    except Exception as e:
+        print(f"❌ DB Pool Status Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to read pool status'}), 500
+
+
+USERS_PAGE_SIZE = 50
+USERS_MAX_PAGE_SIZE = 200
+USER_SEARCH_MAX_LENGTH = 100
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so a search term only matches literally (ESCAPE '\\')."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+@app.route('/api/users', methods=['GET'])
+@role_required(['admin', 'moderator'])
+def get_users(current_user):
+    """
+    Search users newest first - Protected route (admin/moderator only).
+
+    `q` matches name or email case-insensitively, anywhere by default or
+    as a prefix with `match=prefix`; Postgres answers both from trigram
+    GIN indexes, other databases with a plain ILIKE. `status` and
+    `is_verified` filter the list. Pages are keyset-paginated on id: pass
+    `limit` and the `next_cursor` of the previous page as `cursor`.
+    """
+    try:
+        term = request.args.get('q', '').strip()
+        match = request.args.get('match', 'contains')
+        status = request.args.get('status')
+        is_verified = request.args.get('is_verified')
+        cursor = request.args.get('cursor')
+
+        try:
+            limit = int(request.args.get('limit', USERS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, USERS_MAX_PAGE_SIZE))
+
+        if match not in ('contains', 'prefix'):
+            return jsonify({'success': False, 'message': 'match must be contains or prefix'}), 400
+        if len(term) > USER_SEARCH_MAX_LENGTH:
+            return jsonify({'success': False, 'message': f'q must be at most {USER_SEARCH_MAX_LENGTH} characters'}), 400
+
+        query = select(User)
+        if term:
+            pattern = escape_like(term) + '%'
+            if match == 'contains':
+                pattern = '%' + pattern
+            query = query.where(or_(
+                User.name.ilike(pattern, escape='\\'),
+                User.email.ilike(pattern, escape='\\')
+            ))
+        if status:
+            if status not in ('admin', 'moderator', 'user'):
+                return jsonify({'success': False, 'message': 'Invalid status. Must be admin, moderator, or user'}), 400
+            query = query.where(User.status == status)
+        if is_verified is not None:
+            if is_verified.lower() not in ('true', 'false'):
+                return jsonify({'success': False, 'message': 'is_verified must be true or false'}), 400
+            query = query.where(User.is_verified.is_(is_verified.lower() == 'true'))
+        if cursor:
+            try:
+                cursor_id = int(cursor)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+            query = query.where(User.id < cursor_id)
+
+        users = db.session.scalars(query.order_by(User.id.desc()).limit(limit + 1)).all()
+        has_more = len(users) > limit
+        users = users[:limit]
+
         return jsonify({
             'success': True,
-            'users': users_list
+            'users': [user.to_dict() for user in users],
+            'next_cursor': str(users[-1].id) if has_more else None,
+            'has_more': has_more
         }), 200
         
     except Exception as e:
@@ -716,7 +2082,9 @@ def update_user_role(current_user, user_id):
                 }), 400
         
         target_user.status = new_role
+        bump_cache_version(AUTH_CACHE_NAMESPACE)
         db.session.commit()
+        auth_user_cache.invalidate(target_user.id)
         
         return jsonify({
             'success': True,
@@ -777,18 +2145,26 @@ def change_password(current_user):
             return jsonify({'success': False, 'message': 'New password must be at least 6 characters'}), 400
         
         # Verify current password
-        if not check_password_hash(current_user.password, current_password):
+        if not verify_password(current_user.password, current_password):
             return jsonify({'success': False, 'message': 'Current password is incorrect'}), 401
         
         # Update password
-        current_user.password = generate_password_hash(new_password, method='pbkdf2:sha256')
+        current_user.password = hash_password(new_password)
+        current_user.token_version = (current_user.token_version or 0) + 1
+        bump_cache_version(AUTH_CACHE_NAMESPACE)
         db.session.commit()
+        auth_user_cache.invalidate(current_user.id)
         
+        # Older tokens are now revoked; hand back one for the new version
         return jsonify({
             'success': True,
-            'message': 'Password changed successfully'
+            'message': 'Password changed successfully',
+            'token': generate_token(current_user)
         }), 200
         
+    except KdfBusy:
+        db.session.rollback()
+        return kdf_busy_response()
     except Exception as e:
         db.session.rollback()
         print(f"❌ Change Password Error: {str(e)}")
@@ -801,6 +2177,7 @@ def change_password(current_user):
 
 
 @app.route('/api/public/bookings', methods=['POST'])
+@idempotent('public_bookings')
 def create_public_booking():
     """
     Public endpoint for patients to request an appointment.
@@ -831,11 +2208,21 @@ def create_public_booking():
         if not service or not service.is_active:
             return jsonify({'success': False, 'message': 'Selected service is not available'}), 400
 
+        # Optional preferred dentist
+        dentist_id = data.get('dentist_id') or None
+        if dentist_id is not None and (not isinstance(dentist_id, int) or isinstance(dentist_id, bool)):
+            return jsonify({'success': False, 'message': 'dentist_id must be an integer'}), 400
+        if dentist_id is not None:
+            dentist = db.session.get(Dentist, dentist_id)
+            if not dentist or not dentist.is_active or not dentist.performs(service.id):
+                return jsonify({'success': False, 'message': 'Selected dentist is not available for this service'}), 400
+
         booking = Booking(
             customer_name=customer_name,
             customer_email=customer_email,
             customer_phone=customer_phone,
             service_id=service.id,
+            dentist_id=dentist_id,
             preferred_date=preferred_date,
             time_slot=time_slot,
             status='pending',
@@ -843,33 +2230,93 @@ def create_public_booking():
             notes=notes
         )
         db.session.add(booking)
-        db.session.commit()
-
-        send_booking_request_email(booking)
-
-        return jsonify({
+        db.session.flush()
+        record_booking_stat(booking)
+        queue_booking_request_email(booking)
+        payload = {
             'success': True,
             'message': 'Appointment request received',
             'booking': booking.to_dict()
-        }), 201
+        }
+        record_idempotent_response(payload, 201)
+        db.session.commit()
+
+        return jsonify(payload), 201
     except Exception as e:
         db.session.rollback()
         print(f"❌ Create Public Booking Error: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to create booking'}), 500
 
 
+BOOKINGS_PAGE_SIZE = 50
+BOOKINGS_MAX_PAGE_SIZE = 200
+BOOKINGS_STREAM_BATCH = 500
+
+
+def encode_booking_cursor(booking):
+    """Opaque keyset cursor for the (created_at, id) position of a booking."""
+    raw = f"{booking.created_at.isoformat()}|{booking.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_booking_cursor(cursor):
+    """Return (created_at, id) from a cursor, raising ValueError if malformed."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, booking_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(booking_id)
+
+
 @app.route('/api/bookings', methods=['GET'])
 @role_required(['admin', 'moderator'])
 def list_bookings(current_user):
-    """List all bookings for admin/moderator, optionally filter by status."""
+    """
+    List bookings newest first for admin/moderator, optionally filtered by status.
+
+    Pages are keyset-paginated on (created_at, id): pass `limit` and the
+    `next_cursor` of the previous page as `cursor`. With `format=ndjson`
+    the matching bookings are streamed one JSON object per line instead.
+    """
     try:
         status = request.args.get('status')
-        query = Booking.query
+        cursor = request.args.get('cursor')
+        stream = request.args.get('format') == 'ndjson'
+
+        try:
+            limit = int(request.args.get('limit', BOOKINGS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, BOOKINGS_MAX_PAGE_SIZE))
+
+        # Booking.to_dict never reads Dentist.services, so skip its selectin load
+        query = select(Booking).options(joinedload(Booking.dentist).options(lazyload(Dentist.services)))
         if status:
-            query = query.filter_by(status=status)
-        bookings = query.order_by(Booking.created_at.desc()).all()
-        bookings_list = [booking.to_dict() for booking in bookings]
-        return jsonify({'success': True, 'bookings': bookings_list}), 200
+            query = query.where(Booking.status == status)
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_booking_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+            query = query.where(tuple_(Booking.created_at, Booking.id) < tuple_(cursor_created_at, cursor_id))
+        query = query.order_by(Booking.created_at.desc(), Booking.id.desc())
+
+        if stream:
+            def generate():
+                rows = db.session.scalars(query.execution_options(yield_per=BOOKINGS_STREAM_BATCH))
+                for booking in rows:
+                    yield json.dumps(booking.to_dict()) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        bookings = db.session.scalars(query.limit(limit + 1)).all()
+        has_more = len(bookings) > limit
+        bookings = bookings[:limit]
+
+        return jsonify({
+            'success': True,
+            'bookings': [booking.to_dict() for booking in bookings],
+            'next_cursor': encode_booking_cursor(bookings[-1]) if has_more else None,
+            'has_more': has_more
+        }), 200
     except Exception as e:
         print(f"❌ Get All Bookings Error: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to fetch bookings'}), 500
@@ -903,17 +2350,16 @@ def get_services():
     try:
         active_only = request.args.get('active', 'true').lower() == 'true'
 
-        query = Service.query
-        if active_only:
-            query = query.filter_by(is_active=True)
+        def build_payload():
+            query = Service.query
+            if active_only:
+                query = query.filter_by(is_active=True)
 
-        services = query.order_by(Service.created_at.asc()).all()
-        services_list = [s.to_dict() for s in services]
+            services = query.order_by(Service.created_at.asc()).all()
+            last_modified = max((s.updated_at for s in services if s.updated_at), default=None)
+            return {'success': True, 'services': [s.to_dict() for s in services]}, last_modified
 
-        return jsonify({
-            'success': True,
-            'services': services_list
-        }), 200
+        return cached_json_response('services', active_only, build_payload)
 
     except Exception as e:
         print(f"❌ Get Services Error: {str(e)}")
@@ -947,7 +2393,9 @@ def create_service(current_user):
         )
 
         db.session.add(service)
+        bump_cache_version('services')
         db.session.commit()
+        public_cache.invalidate('services')
 
         return jsonify({
             'success': True,
@@ -979,11 +2427,22 @@ def update_service(current_user, service_id):
         if 'price' in data:
             service.price = data['price'] or 0
         if 'duration_minutes' in data:
+            if data['duration_minutes'] != service.duration_minutes:
+                # Dentist calendars hold end times computed from the old duration
+                days = [day for (day,) in db.session.query(Booking.preferred_date).filter(
+                    Booking.service_id == service.id,
+                    Booking.dentist_id.isnot(None),
+                    Booking.status.in_(SLOT_HOLDING_STATUSES)
+                ).distinct()]
+                for day in sorted(days):
+                    bump_cache_version(booking_day_namespace(day))
             service.duration_minutes = data['duration_minutes']
         if 'is_active' in data:
             service.is_active = bool(data['is_active'])
 
+        bump_cache_version('services')
         db.session.commit()
+        public_cache.invalidate('services')
 
         return jsonify({
             'success': True,
@@ -1007,7 +2466,9 @@ def delete_service(current_user, service_id):
             return jsonify({'success': False, 'message': 'Service not found'}), 404
 
         db.session.delete(service)
+        bump_cache_version('services')
         db.session.commit()
+        public_cache.invalidate('services')
 
         return jsonify({
             'success': True,
@@ -1020,12 +2481,839 @@ def delete_service(current_user, service_id):
         return jsonify({'success': False, 'message': 'Failed to delete service'}), 500
 
 
+# ============================================================================
+# STORAGE BACKENDS
+# ============================================================================
+
+# Content-addressed uploads are stored as content/<sha256 prefix>.<ext>;
+# the same key always means the same bytes, so they may be cached forever
+HASHED_UPLOAD_RE = re.compile(r'^content/[0-9a-f]{20}\.[a-z0-9]+$')
+
+
+def upload_cache_control(key):
+    """Cache-Control for an uploaded file: immutable when content-hashed, revalidated hourly otherwise."""
+    if HASHED_UPLOAD_RE.match(key):
+        return f"public, max-age={app.config['IMMUTABLE_MAX_AGE']}, immutable"
+    return f"public, max-age={app.config['UPLOAD_CACHE_MAX_AGE']}"
+
+
+def media_key(url):
+    """Storage key of a stored /uploads/... URL, or None for external URLs."""
+    if url and url.startswith('/uploads/'):
+        return url[len('/uploads/'):]
+    return None
+
+
+def media_public_url(url):
+    """URL clients should fetch a stored media URL from."""
+    key = media_key(url)
+    return media_storage.public_url(key) if key else url
+
+
+class LocalStorage:
+    """
+    Uploads on the local filesystem under UPLOADS_ROOT, served by
+    uploaded_file. Only shared between API replicas through a shared volume.
+    """
+    local = True
+
+    def __init__(self, root):
+        self.root = root
+        # Same filesystem as root, so staged files are moved into place atomically
+        self.staging_dir = os.path.join(root, '.staging')
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def public_url(self, key):
+        return f"/uploads/{key}"
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def save(self, key, staged_path, content_type=None):
+        """Move a staged file to key."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staged_path, path)
+
+    @contextmanager
+    def open(self, key):
+        with open(self.path(key), 'rb') as f:
+            yield f
+
+    def trash(self, key):
+        """Move key out of sight, keeping it restorable; False if it does not exist."""
+        try:
+            os.rename(self.path(key), f"{self.path(key)}.gc")
+            return True
+        except FileNotFoundError:
+            return False
+
+    def restore(self, key):
+        if self.exists(key):
+            self.purge(key)
+        else:
+            os.replace(f"{self.path(key)}.gc", self.path(key))
+
+    def purge(self, key):
+        try:
+            os.remove(f"{self.path(key)}.gc")
+        except FileNotFoundError:
+            pass
+        upload_stat_cache.invalidate(self.path(key))
+
+    def list_keys(self, prefix):
+        """(key, size) of the files directly under prefix."""
+        directory = self.path(prefix)
+        if not os.path.isdir(directory):
+            return
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith('.gc'):
+                yield f"{prefix}{entry.name}", entry.stat().st_size
+
+    def cleanup(self, stale_before):
+        """Delete staged and trashed files left behind by crashed processes."""
+        leftovers = []
+        if os.path.isdir(self.staging_dir):
+            leftovers += [entry for entry in os.scandir(self.staging_dir) if entry.is_file()]
+        if os.path.isdir(self.path('content')):
+            leftovers += [entry for entry in os.scandir(self.path('content')) if entry.name.endswith(('.gc', '.tmp'))]
+        for entry in leftovers:
+            if entry.stat().st_mtime < stale_before:
+                os.remove(entry.path)
+
+
+class S3Storage:
+    """
+    Uploads in an S3-compatible bucket (AWS S3, MinIO, ...), so every API
+    replica sees the same media.
+
+    boto3 is imported on first use. Each process keeps one client whose
+    connection pool holds up to S3_MAX_POOL_CONNECTIONS keep-alive
+    connections; files above S3_MULTIPART_THRESHOLD are streamed from the
+    staged file as a multipart upload in S3_MULTIPART_CHUNKSIZE parts.
+    Objects are public through S3_PUBLIC_URL (bucket policy or CDN) when it
+    is set, otherwise /uploads redirects to a presigned URL.
+    """
+    local = False
+    staging_dir = None
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, access_key_id=None,
+                 secret_access_key=None, public_url=None, max_pool_connections=10,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024,
+                 max_concurrency=4, presign_seconds=3600):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.public_base = public_url.rstrip('/') if public_url else None
+        self.max_pool_connections = max_pool_connections
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.max_concurrency = max_concurrency
+        self.presign_seconds = presign_seconds
+        self._client = None
+        self._transfer_config = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+                from botocore.config import Config
+
+                self._client = boto3.session.Session().client(
+                    's3',
+                    endpoint_url=self.endpoint_url,
+                    region_name=self.region,
+                    aws_access_key_id=self.access_key_id,
+                    aws_secret_access_key=self.secret_access_key,
+                    config=Config(
+                        max_pool_connections=self.max_pool_connections,
+                        tcp_keepalive=True,
+                        retries={'max_attempts': 5, 'mode': 'standard'},
+                        # MinIO and most self-hosted stand-ins want path-style URLs
+                        s3={'addressing_style': 'path' if self.endpoint_url else 'auto'}
+                    )
+                )
+                self._transfer_config = TransferConfig(
+                    multipart_threshold=self.multipart_threshold,
+                    multipart_chunksize=self.multipart_chunksize,
+                    max_concurrency=self.max_concurrency
+                )
+                self._pid = os.getpid()
+            return self._client
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def _trash_key(self, key):
+        return f"{self.prefix}trash/{key}"
+
+    @staticmethod
+    def _is_missing(error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def public_url(self, key):
+        if self.public_base:
+            return f"{self.public_base}/{quote(self._object_key(key))}"
+        return f"/uploads/{key}"
+
+    def presigned_url(self, key):
+        return self._get_client().generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._object_key(key)},
+            ExpiresIn=self.presign_seconds
+        )
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self._get_client().head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    def save(self, key, staged_path, content_type=None):
+        """Upload a staged file to key (multipart above the threshold) and delete it."""
+        client = self._get_client()
+        extra_args = {'CacheControl': upload_cache_control(key)}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        try:
+            client.upload_file(staged_path, self.bucket, self._object_key(key),
+                               ExtraArgs=extra_args, Config=self._transfer_config)
+        finally:
+            os.remove(staged_path)
+
+    @contextmanager
+    def open(self, key):
+        # Ranged parallel GETs into a local temporary file, which image
+        # decoders can seek in
+        client = self._get_client()
+        with tempfile.TemporaryFile() as f:
+            client.download_fileobj(self.bucket, self._object_key(key), f, Config=self._transfer_config)
+            f.seek(0)
+            yield f
+
+    def trash(self, key):
+        from botocore.exceptions import ClientError
+        client = self._get_client()
+        try:
+            client.copy_object(Bucket=self.bucket, Key=self._trash_key(key),
+                               CopySource={'Bucket': self.bucket, 'Key': self._object_key(key)})
+        except ClientError as e:
+            if self._is_missing(e):
+                return False
+            raise
+        client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return True
+
+    def restore(self, key):
+        if not self.exists(key):
+            self._get_client().copy_object(Bucket=self.bucket, Key=self._object_key(key),
+                                           CopySource={'Bucket': self.bucket, 'Key': self._trash_key(key)})
+        self.purge(key)
+
+    def purge(self, key):
+        self._get_client().delete_object(Bucket=self.bucket, Key=self._trash_key(key))
+
+    def _list_objects(self, object_prefix):
+        paginator = self._get_client().get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=object_prefix, Delimiter='/'):
+            yield from page.get('Contents', [])
+
+    def list_keys(self, prefix):
+        for obj in self._list_objects(self._object_key(prefix)):
+            yield obj['Key'][len(self.prefix):], obj['Size']
+
+    def cleanup(self, stale_before):
+        """Delete trashed objects left behind by crashed sweeps."""
+        stale = [{'Key': obj['Key']} for obj in self._list_objects(self._trash_key('content/'))
+                 if obj['LastModified'].timestamp() < stale_before]
+        for start in range(0, len(stale), 1000):
+            self._get_client().delete_objects(Bucket=self.bucket, Delete={'Objects': stale[start:start + 1000]})
+
+
+def create_media_storage():
+    if app.config['STORAGE_BACKEND'] == 's3':
+        return S3Storage(
+            app.config['S3_BUCKET'],
+            prefix=app.config['S3_PREFIX'],
+            endpoint_url=app.config['S3_ENDPOINT_URL'],
+            region=app.config['S3_REGION'],
+            access_key_id=app.config['S3_ACCESS_KEY_ID'],
+            secret_access_key=app.config['S3_SECRET_ACCESS_KEY'],
+            public_url=app.config['S3_PUBLIC_URL'],
+            max_pool_connections=app.config['S3_MAX_POOL_CONNECTIONS'],
+            multipart_threshold=app.config['S3_MULTIPART_THRESHOLD'],
+            multipart_chunksize=app.config['S3_MULTIPART_CHUNKSIZE'],
+            max_concurrency=app.config['S3_MAX_CONCURRENCY'],
+            presign_seconds=app.config['S3_PRESIGN_SECONDS']
+        )
+    return LocalStorage(app.config['UPLOADS_ROOT'])
+
+
+media_storage = create_media_storage()
+
+
+def stage_upload(stream, digest=None):
+    """Copy a stream to a staging file, feeding digest on the way; returns (path, size)."""
+    if media_storage.staging_dir:
+        os.makedirs(media_storage.staging_dir, exist_ok=True)
+    fd, staged_path = tempfile.mkstemp(dir=media_storage.staging_dir, suffix='.tmp')
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while chunk := stream.read(64 * 1024):
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(staged_path)
+        raise
+    return staged_path, size
+
+
+def store_upload(key, stream):
+    """Store a stream under key in the media storage; returns its /uploads URL."""
+    staged_path, _ = stage_upload(stream)
+    media_storage.save(key, staged_path, mimetypes.guess_type(key)[0])
+    return f"/uploads/{key}"
+
+
+@app.cli.command('copy-media-to-storage')
+def copy_media_to_storage_command():
+    """Upload files from UPLOADS_ROOT that the configured storage backend does not have yet."""
+    if media_storage.local:
+        print("ℹ️ STORAGE_BACKEND is local, nothing to copy")
+        return
+    copied = 0
+    for directory, _, filenames in os.walk(app.config['UPLOADS_ROOT']):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            key = os.path.relpath(path, app.config['UPLOADS_ROOT']).replace(os.sep, '/')
+            if key.startswith('.') or filename.endswith(('.gc', '.tmp')) or media_storage.exists(key):
+                continue
+            with open(path, 'rb') as f:
+                store_upload(key, f)
+            copied += 1
+    print(f"✅ Copied {copied} file(s) to {media_storage.bucket}")
+
+# ============================================================================
+# MEDIA STORE
+# ============================================================================
+
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+
+
+def register_media_blob(sha256, url, size, parent_url=None):
+    """Create the media_blobs row for url, or mark it as just seen; commits on its own connection."""
+    now = datetime.utcnow()
+    touch = update(MediaBlob).where(MediaBlob.url == url).values(last_seen_at=now)
+    with db.engine.begin() as conn:
+        if conn.execute(touch).rowcount:
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(MediaBlob).values(
+                    url=url, sha256=sha256, size=size, parent_url=parent_url,
+                    created_at=now, last_seen_at=now
+                ))
+        except IntegrityError:
+            # Another upload of the same content registered it first
+            conn.execute(touch)
+
+
+def store_media(stream, extension, parent_url=None):
+    """
+    Store a file in the content-addressed media store; returns its URL.
+
+    The SHA-256 is computed while the stream is copied to a staging file,
+    so uploads are never held in memory, and identical content is kept
+    once. The blob is registered (committed) before the file is handed to
+    the storage backend, which is what lets collect_media_garbage run
+    alongside uploads.
+    """
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    digest = hashlib.sha256()
+    staged_path, size = stage_upload(stream, digest)
+    try:
+        sha256 = digest.hexdigest()
+        url = f"/uploads/content/{sha256[:20]}.{extension}"
+        register_media_blob(sha256, url, size, parent_url)
+
+        key = media_key(url)
+        if media_storage.exists(key):
+            os.remove(staged_path)
+        else:
+            media_storage.save(key, staged_path, mimetypes.guess_type(url)[0])
+        return url
+    except BaseException:
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+        raise
+
+
+def save_content_upload(file):
+    """Save an uploaded content file in the media store; returns the public URL."""
+    # From the raw name allowed_file() checked: secure_filename() drops non-ASCII
+    # stems, so '照片.png' would come back as just 'png'
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    return store_media(file.stream, extension)
+
+
+def media_garbage_filter(cutoff):
+    """
+    Blobs that may be deleted: sources no content block points at and
+    derivatives whose source is gone, in both cases not uploaded again
+    since cutoff (which also covers uploads whose block is not committed
+    yet).
+    """
+    parent = aliased(MediaBlob)
+    referenced = exists().where(ContentBlock.media_url == MediaBlob.url)
+    parent_exists = exists().where(parent.url == MediaBlob.parent_url)
+    return and_(
+        MediaBlob.last_seen_at < cutoff,
+        or_(
+            and_(MediaBlob.parent_url.is_(None), ~referenced),
+            and_(MediaBlob.parent_url.is_not(None), ~parent_exists)
+        )
+    )
+
+
+def remove_media_files(urls):
+    """Delete the files of blobs whose rows are gone; returns how many were removed."""
+    trashed = [url for url in urls if media_storage.trash(media_key(url))]
+    if not trashed:
+        return 0
+
+    # An upload of the same content may have registered the blob again
+    # after our DELETE; it committed before touching the file, so any
+    # such upload is visible here and gets its file back
+    revived = set(db.session.scalars(select(MediaBlob.url).where(MediaBlob.url.in_(trashed))))
+    db.session.rollback()
+
+    for url in trashed:
+        if url in revived:
+            media_storage.restore(media_key(url))
+        else:
+            media_storage.purge(media_key(url))
+    return len(trashed) - len(revived)
+
+
+def collect_media_garbage():
+    """
+    Sweep unreferenced blobs in batches of MEDIA_GC_BATCH; returns the
+    number of files removed. Derivatives orphaned by one batch are picked
+    up by the next.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['MEDIA_GC_GRACE_SECONDS'])
+    removed = 0
+    while True:
+        candidates = db.session.scalars(
+            select(MediaBlob.url).where(media_garbage_filter(cutoff)).limit(app.config['MEDIA_GC_BATCH'])
+        ).all()
+        if not candidates:
+            db.session.rollback()
+            return removed
+
+        # Re-check the conditions in the DELETE itself so a block committed
+        # since the SELECT keeps its blob
+        deleted = db.session.scalars(
+            delete(MediaBlob).where(MediaBlob.url.in_(candidates), media_garbage_filter(cutoff))
+            .returning(MediaBlob.url).execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+        removed += remove_media_files(deleted)
+
+
+def adopt_media_files():
+    """
+    Register content-addressed files that have no media_blobs row yet
+    (uploaded before the media store existed) and delete leftover
+    temporary files. Returns the number of files adopted.
+    """
+    known = set(db.session.scalars(select(MediaBlob.url)))
+    # Derivatives are only recorded on the blocks that use them
+    parents = {}
+    for media_url, variants in db.session.execute(
+        select(ContentBlock.media_url, ContentBlock.media_variants).where(ContentBlock.media_variants.is_not(None))
+    ):
+        for url in variant_urls(variants):
+            parents[url] = media_url
+    db.session.rollback()
+
+    media_storage.cleanup(time.time() - app.config['MEDIA_GC_GRACE_SECONDS'])
+    adopted = 0
+    for key, size in list(media_storage.list_keys('content/')):
+        url = f"/uploads/{key}"
+        if url in known or not HASHED_UPLOAD_RE.match(key):
+            continue
+        digest = hashlib.sha256()
+        with media_storage.open(key) as f:
+            while chunk := f.read(64 * 1024):
+                digest.update(chunk)
+        register_media_blob(digest.hexdigest(), url, size, parents.get(url))
+        adopted += 1
+    return adopted
+
+
+def run_media_gc(stop_event=None):
+    """Sweep the media store every MEDIA_GC_INTERVAL_SECONDS until stop_event is set."""
+    stop_event = stop_event or threading.Event()
+    print("🧹 Media GC started")
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                removed = collect_media_garbage()
+            if removed:
+                print(f"🧹 Removed {removed} unreferenced media file(s)")
+        except Exception as e:
+            print(f"❌ Media GC Error: {str(e)}")
+        stop_event.wait(app.config['MEDIA_GC_INTERVAL_SECONDS'])
+
+
+@app.cli.command('media-gc')
+@click.option('--once', is_flag=True, help='Run a single sweep and exit.')
+@click.option('--scan', is_flag=True, help='First register content-hashed files that have no media_blobs row.')
+def media_gc_command(once, scan):
+    """Delete media files no content block references any more."""
+    if scan:
+        print(f"📦 Adopted {adopt_media_files()} media file(s)")
+    if once:
+        print(f"🧹 Removed {collect_media_garbage()} unreferenced media file(s)")
+        return
+    run_media_gc()
+
+# ============================================================================
+# UPLOAD SERVING
+# ============================================================================
+
+class UploadStatCache:
+    """Thread-safe TTL + LRU cache of (size, mtime) for files under UPLOADS_ROOT."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """(size, mtime) of a regular file, or None if it does not exist."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] >= now:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        info = (st.st_size, st.st_mtime)
+        with self._lock:
+            self._entries[path] = (now + self.ttl, info)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return info
+
+    def invalidate(self, path):
+        with self._lock:
+            self._entries.pop(path, None)
+
+
+upload_stat_cache = UploadStatCache(app.config['UPLOAD_STAT_CACHE_SECONDS'], app.config['UPLOAD_STAT_CACHE_SIZE'])
+
+
+def iter_file_range(f, length, block_size=64 * 1024):
+    """Yield `length` bytes from the current position of f, then close it."""
+    try:
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def upload_cache_headers(response, filename):
+    response.headers['Cache-Control'] = upload_cache_control(filename)
+    return response
+
+
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    """Serve uploaded files from the uploads directory"""
-    # Using absolute path to avoid directory confusion
-    uploads_dir = os.path.abspath(os.path.join(os.getcwd(), 'uploads'))
-    return send_from_directory(uploads_dir, filename)
+    """
+    Serve uploaded files from the uploads directory.
+
+    With UPLOAD_OFFLOAD=x-accel (nginx) or x-sendfile (Apache, lighttpd)
+    the response only names the file and the front server sends it, so
+    media downloads never hold a gunicorn worker. Otherwise the file is
+    served here with ETag/Last-Modified revalidation and single byte
+    ranges; the body is the server's wsgi.file_wrapper, which gunicorn
+    turns into a zero-copy sendfile(2).
+
+    With the S3 backend the client is redirected to the object instead.
+    """
+    path = safe_join(app.config['UPLOADS_ROOT'], filename)
+    if path is None or any(part.startswith('.') for part in filename.split('/')):
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    if not media_storage.local:
+        if media_storage.public_base:
+            response = redirect(media_storage.public_url(filename), 301)
+            return upload_cache_headers(response, filename)
+        response = redirect(media_storage.presigned_url(filename))
+        response.headers['Cache-Control'] = f"private, max-age={media_storage.presign_seconds // 2}"
+        return response
+    info = upload_stat_cache.get(path)
+    if info is None:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+    size, mtime = info
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    offload = app.config['UPLOAD_OFFLOAD']
+    if offload:
+        response = Response(mimetype=mimetype)
+        if offload == 'x-accel':
+            response.headers['X-Accel-Redirect'] = app.config['UPLOAD_ACCEL_PREFIX'] + quote(filename)
+        else:
+            response.headers['X-Sendfile'] = path
+        return upload_cache_headers(response, filename)
+
+    etag = f"{size:x}-{int(mtime * 1000):x}"
+    last_modified = datetime.fromtimestamp(int(mtime), UTC)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return upload_cache_headers(response, filename)
+
+    start, length, status = 0, size, 200
+    byte_range = request.range
+    if_range = request.if_range
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    range_valid = not (if_range.etag or if_range.date) or if_range.etag == etag or if_range.date == last_modified
+    if byte_range is not None and range_valid:
+        if len(byte_range.ranges) == 1:
+            bounds = byte_range.range_for_length(size)
+            if bounds is None:
+                response = Response(status=416)
+                response.headers['Content-Range'] = f'bytes */{size}'
+                return response
+            start, length, status = bounds[0], bounds[1] - bounds[0], 206
+
+    if request.method == 'HEAD':
+        body = b''
+    else:
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            upload_stat_cache.invalidate(path)
+            return jsonify({'success': False, 'message': 'File not found'}), 404
+        f.seek(start)
+
+        # Servers may not send past Content-Length (PEP 3333), so their file
+        # wrapper is safe for partial responses too
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        body = file_wrapper(f, 64 * 1024) if file_wrapper else iter_file_range(f, length)
+
+    response = Response(body, status=status, mimetype=mimetype, direct_passthrough=True)
+    response.content_length = length
+    response.accept_ranges = 'bytes'
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return upload_cache_headers(response, filename)
+
+# ============================================================================
+# IMAGE DERIVATIVES
+# ============================================================================
+
+IMAGE_VARIANT_TYPES = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+
+def build_image_variants(source_url):
+    """
+    Decode an uploaded image once and encode resized derivatives.
+
+    Widths come from IMAGE_VARIANT_WIDTHS (never upscaled; the original
+    width is added when it is smaller than the largest one) and each width
+    is encoded in every IMAGE_VARIANT_FORMATS format Pillow supports.
+    Returns the media_variants dict, or None when the file is not a still
+    image or Pillow is unavailable.
+    """
+    try:
+        from PIL import ExifTags, Image, ImageOps, features
+    except ImportError:
+        print("⚠️ Pillow is not installed, skipping image derivatives")
+        return None
+
+    formats = [name for name in app.config['IMAGE_VARIANT_FORMATS']
+               if name in IMAGE_VARIANT_TYPES and features.check(name)]
+    if not formats:
+        return None
+
+    with media_storage.open(media_key(source_url)) as f, Image.open(f) as image:
+        if getattr(image, 'is_animated', False):
+            return None
+        # Record the original dimensions; draft() below may shrink the decode
+        width, height = image.size
+        if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+            width, height = height, width
+        if image.format == 'JPEG':
+            # Let libjpeg decode at a reduced scale when even the largest
+            # derivative is much smaller than the original (square box so
+            # the result still covers it after an EXIF rotation)
+            largest = max(app.config['IMAGE_VARIANT_WIDTHS'])
+            image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    widths = sorted({w for w in app.config['IMAGE_VARIANT_WIDTHS'] if w <= width} |
+                    ({width} if width < max(app.config['IMAGE_VARIANT_WIDTHS']) else set()))
+    if not widths:
+        widths = [max(app.config['IMAGE_VARIANT_WIDTHS'])]
+
+    variants = {'source': source_url, 'width': width, 'height': height,
+                'formats': {IMAGE_VARIANT_TYPES[name][1]: [] for name in formats}}
+
+    # Resize largest first and derive each smaller width from the previous one
+    resized = image
+    for target in reversed(widths):
+        if target != resized.width:
+            resized = resized.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+        for name in formats:
+            pil_format, mimetype = IMAGE_VARIANT_TYPES[name]
+            buffer = io.BytesIO()
+            if name == 'webp':
+                resized.save(buffer, pil_format, quality=app.config['IMAGE_WEBP_QUALITY'], method=4)
+            else:
+                resized.save(buffer, pil_format, quality=app.config['IMAGE_AVIF_QUALITY'], speed=6)
+            buffer.seek(0)
+            variants['formats'][mimetype].insert(0, {
+                'url': store_media(buffer, name, parent_url=source_url),
+                'width': resized.width,
+                'height': resized.height,
+            })
+    return variants
+
+
+def media_srcset(variants):
+    """Public srcset fields for a content block's media_variants."""
+    if not variants:
+        return {}
+    return {
+        'media_width': variants['width'],
+        'media_height': variants['height'],
+        'srcset': {
+            mimetype: ', '.join(f"{media_public_url(item['url'])} {item['width']}w" for item in items)
+            for mimetype, items in variants['formats'].items()
+        }
+    }
+
+
+def variant_urls(variants):
+    return [item['url'] for items in (variants or {}).get('formats', {}).values() for item in items]
+
+
+def record_image_variants(block_id, source_url):
+    """Build derivatives and store them, unless the block's media changed meanwhile."""
+    with app.app_context():
+        try:
+            variants = build_image_variants(source_url)
+            if variants is None:
+                return None
+            updated = db.session.execute(update(ContentBlock).where(
+                ContentBlock.id == block_id, ContentBlock.media_url == source_url
+            ).values(media_variants=variants).execution_options(synchronize_session=False)).rowcount
+            if updated:
+                bump_cache_version('content')
+            db.session.commit()
+            if updated:
+                public_cache.invalidate('content')
+                print(f"🖼️ Built {len(variant_urls(variants))} derivative(s) for {source_url}")
+            return variants
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Image Derivative Error ({source_url}): {str(e)}")
+            return None
+        finally:
+            db.session.remove()
+
+
+class ImageDerivativePipeline:
+    """
+    Background thread pool that builds content image derivatives.
+
+    Uploads return as soon as the original is saved; the derivatives are
+    attached to the block when they are ready. Pillow releases the GIL
+    while decoding, resizing and encoding, so threads keep several cores
+    busy without copying images between processes. IMAGE_WORKERS=0 builds
+    them inline on the request thread.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-derivatives')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, block_id, source_url):
+        if self.workers <= 0:
+            return record_image_variants(block_id, source_url)
+        return self._get_executor().submit(record_image_variants, block_id, source_url)
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+image_pipeline = ImageDerivativePipeline(app.config['IMAGE_WORKERS'])
+atexit.register(image_pipeline.shutdown)
+
+
+@app.cli.command('build-image-variants')
+@click.option('--all', 'rebuild_all', is_flag=True, help='Rebuild derivatives that already exist too.')
+def build_image_variants_command(rebuild_all):
+    """Build missing WebP/AVIF derivatives for content block images."""
+    query = ContentBlock.query.filter(ContentBlock.media_url.like('/uploads/content/%'))
+    if not rebuild_all:
+        query = query.filter(ContentBlock.media_variants.is_(None))
+    blocks = [(block.id, block.media_url) for block in query.all()]
+    built = sum(1 for block_id, url in blocks if record_image_variants(block_id, url))
+    print(f"✅ Built derivatives for {built} of {len(blocks)} content block(s)")
+
 # ============================================================================
 # CONTENT MANAGEMENT ENDPOINTS
 # ============================================================================
@@ -1074,16 +3362,8 @@ def create_content_block(current_user):
         file = request.files.get('media_file')
 
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filename = f"{key}_{int(datetime.utcnow().timestamp())}_{filename}"
-            
-            # Save to uploads/content/
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            file.save(filepath)
-            
-            # Store as /uploads/content/filename
-            media_url = f"/uploads/content/{filename}"
+            # Stored as /uploads/content/<content hash>.<ext>
+            media_url = save_content_upload(file)
             
             print(f"✅ File saved: {media_url}")
 
@@ -1096,10 +3376,15 @@ def create_content_block(current_user):
         )
 
         db.session.add(block)
+        bump_cache_version('content')
         db.session.commit()
+        public_cache.invalidate('content')
 
         print(f"✅ Content block created: ID={block.id}")
 
+        if media_url:
+            image_pipeline.submit(block.id, media_url)
+
         return jsonify({
             'success': True,
             'message': 'Content block created',
@@ -1140,34 +3425,20 @@ def update_content_block(current_user, block_id):
 
         # Handle file upload
         file = request.files.get('media_file')
+        media_changed = False
         if file and file.filename:
             print(f"📁 File received: {file.filename}")
             
             if allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filename = f"{block.key}_{int(datetime.utcnow().timestamp())}_{filename}"
-                
-                # Save to uploads/content/
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                
-                print(f"💾 Saving file to: {filepath}")
-                file.save(filepath)
-
-                # Delete old file if exists
-                if block.media_url:
-                    # Convert URL path to filesystem path
-                    old_path = block.media_url.replace('/uploads/', 'uploads/')
-                    print(f"🗑️ Attempting to delete old file: {old_path}")
-                    if os.path.exists(old_path):
-                        try:
-                            os.remove(old_path)
-                            print(f"✅ Old file deleted")
-                        except Exception as e:
-                            print(f"⚠️ Could not delete old file: {e}")
-
-                # Store as /uploads/content/filename
-                block.media_url = f"/uploads/content/{filename}"
+                # Stored as /uploads/content/<content hash>.<ext>
+                media_url = save_content_upload(file)
+                print(f"💾 Saved file as: {media_url}")
+
+                if media_url != block.media_url:
+                    # The old file stays until the media GC finds it unreferenced
+                    media_changed = True
+                    block.media_url = media_url
+                    block.media_variants = None
                 print(f"✅ New media URL: {block.media_url}")
             else:
                 print(f"❌ File type not allowed: {file.filename}")
@@ -1177,10 +3448,15 @@ def update_content_block(current_user, block_id):
 
         block.updated_by = current_user.id
         block.updated_at = datetime.utcnow()
+        bump_cache_version('content')
         db.session.commit()
+        public_cache.invalidate('content')
 
         print(f"✅ Content block updated successfully")
 
+        if media_changed:
+            image_pipeline.submit(block.id, block.media_url)
+
         return jsonify({
             'success': True,
             'message': 'Content block updated',
@@ -1216,7 +3492,9 @@ def update_content_block_json(current_user, block_id):
 
         block.updated_by = current_user.id
         block.updated_at = datetime.utcnow()
+        bump_cache_version('content')
         db.session.commit()
+        public_cache.invalidate('content')
 
         print(f"✅ JSON update successful")
 
@@ -1241,26 +3519,29 @@ def update_content_block_json(current_user, block_id):
 def dashboard_summary(current_user):
     """Get dashboard summary statistics - Admin/Moderator only"""
     try:
-        total_users = User.query.count()
-        verified_users = User.query.filter_by(is_verified=True).count()
-        admin_users = User.query.filter_by(status='admin').count()
-        moderator_users = User.query.filter_by(status='moderator').count()
-
-        total_bookings = Booking.query.count()
-        pending_bookings = Booking.query.filter_by(status='pending').count()
-        confirmed_bookings = Booking.query.filter_by(status='confirmed').count()
-        completed_bookings = Booking.query.filter_by(status='completed').count()
-        cancelled_bookings = Booking.query.filter_by(status='cancelled').count()
-
-        # Calculate total revenue from completed bookings
-        completed_bookings_query = Booking.query.filter_by(status='completed')
-        total_revenue = sum(float(booking.price) for booking in completed_bookings_query.all() if booking.price)
-
-        # Get bookings from last 7 days
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        recent_bookings = Booking.query.filter(Booking.created_at >= seven_days_ago).count()
-
-        total_services = Service.query.count()
+        # One conditional-aggregate pass over users
+        total_users, verified_users, admin_users, moderator_users = db.session.query(
+            func.count(User.id),
+            count_where(User.is_verified.is_(True)),
+            count_where(User.status == 'admin'),
+            count_where(User.status == 'moderator')
+        ).one()
+
+        # One pass over the daily_stats rollup for booking counts and revenue
+        seven_days_ago = datetime.utcnow().date() - timedelta(days=6)
+        (total_bookings, pending_bookings, confirmed_bookings, completed_bookings,
+         cancelled_bookings, recent_bookings, total_revenue) = db.session.query(
+            func.coalesce(func.sum(DailyStat.bookings_count), 0),
+            sum_where(DailyStat.bookings_count, DailyStat.status == 'pending'),
+            sum_where(DailyStat.bookings_count, DailyStat.status == 'confirmed'),
+            sum_where(DailyStat.bookings_count, DailyStat.status == 'completed'),
+            sum_where(DailyStat.bookings_count, DailyStat.status == 'cancelled'),
+            sum_where(DailyStat.bookings_count, DailyStat.day >= seven_days_ago),
+            sum_where(DailyStat.revenue, DailyStat.status == 'completed')
+        ).filter(DailyStat.status != REGISTRATION_STAT_STATUS).one()
+        total_revenue = float(total_revenue or 0)
+
+        total_services = db.session.query(func.count(Service.id)).scalar()
 
         return jsonify({
             'success': True,
@@ -1306,74 +3587,59 @@ def dashboard_charts(current_user):
         elif range_type == '90d':
             days = 90
         
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Bookings over time (daily)
+        # Calendar-day buckets ending today; empty days are filled in below
+        today = datetime.utcnow().date()
+        start_day = today - timedelta(days=days - 1)
+
+        # Bookings, completed revenue and registrations per day from the rollup
+        bookings_by_day = {}
+        revenue_by_day = {}
+        users_by_day = {}
+        for day, count, revenue, registrations in db.session.query(
+            DailyStat.day,
+            sum_where(DailyStat.bookings_count, DailyStat.status != REGISTRATION_STAT_STATUS),
+            sum_where(DailyStat.revenue, DailyStat.status == 'completed'),
+            func.coalesce(func.sum(DailyStat.registrations), 0)
+        ).filter(
+            DailyStat.day >= start_day
+        ).group_by(DailyStat.day).all():
+            label = day.isoformat()
+            bookings_by_day[label] = count
+            revenue_by_day[label] = float(revenue or 0)
+            users_by_day[label] = registrations
+
         bookings_data = []
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            next_date = date + timedelta(days=1)
-            count = Booking.query.filter(
-                Booking.created_at >= date,
-                Booking.created_at < next_date
-            ).count()
-            bookings_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'bookings': count
-            })
-        
-        # Revenue over time (daily)
         revenue_data = []
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            next_date = date + timedelta(days=1)
-            day_bookings = Booking.query.filter(
-                Booking.created_at >= date,
-                Booking.created_at < next_date,
-                Booking.status == 'completed'
-            ).all()
-            revenue = sum(float(b.price) for b in day_bookings if b.price)
-            revenue_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'revenue': revenue
-            })
-        
-        # User registrations over time (daily)
         users_data = []
         for i in range(days):
-            date = start_date + timedelta(days=i)
-            next_date = date + timedelta(days=1)
-            count = User.query.filter(
-                User.created_at >= date,
-                User.created_at < next_date
-            ).count()
-            users_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'users': count
-            })
-        
+            label = (start_day + timedelta(days=i)).isoformat()
+            bookings_data.append({'date': label, 'bookings': bookings_by_day.get(label, 0)})
+            revenue_data.append({'date': label, 'revenue': revenue_by_day.get(label, 0.0)})
+            users_data.append({'date': label, 'users': users_by_day.get(label, 0)})
+
         # Booking status distribution
-        status_distribution = {
-            'pending': Booking.query.filter_by(status='pending').count(),
-            'confirmed': Booking.query.filter_by(status='confirmed').count(),
-            'completed': Booking.query.filter_by(status='completed').count(),
-            'cancelled': Booking.query.filter_by(status='cancelled').count()
-        }
+        status_distribution = {'pending': 0, 'confirmed': 0, 'completed': 0, 'cancelled': 0}
+        for status, count in db.session.query(
+            DailyStat.status,
+            func.coalesce(func.sum(DailyStat.bookings_count), 0)
+        ).filter(DailyStat.status.in_(list(status_distribution))).group_by(DailyStat.status).all():
+            status_distribution[status] = count
 
         # Revenue by service (for charts)
-        revenue_by_service = []
-        services = Service.query.all()
-        for service in services:
-            completed_for_service = Booking.query.filter_by(
-                service_id=service.id,
-                status='completed'
-            ).all()
-            revenue = sum(float(b.price) for b in completed_for_service if b.price)
-            revenue_by_service.append({
-                'service_id': service.id,
-                'service_name': service.name,
-                'revenue': revenue
-            })
+        revenue_by_service = [
+            {
+                'service_id': service_id,
+                'service_name': service_name,
+                'revenue': float(revenue or 0)
+            }
+            for service_id, service_name, revenue in db.session.query(
+                Service.id,
+                Service.name,
+                func.coalesce(func.sum(DailyStat.revenue), 0)
+            ).outerjoin(
+                DailyStat, and_(DailyStat.service_id == Service.id, DailyStat.status == 'completed')
+            ).group_by(Service.id, Service.name).order_by(Service.id).all()
+        ]
 
         return jsonify({
             'success': True,
@@ -1394,6 +3660,9 @@ def dashboard_charts(current_user):
 # UPDATE BOOKING STATUS (Admin / Moderator)
 # =====================================================================
 
+BOOKING_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+
+
 @app.route('/api/bookings/<int:booking_id>/status', methods=['PATCH'])
 @role_required(['admin', 'moderator'])
 def update_booking_status(current_user, booking_id):
@@ -1412,52 +3681,1158 @@ def update_booking_status(current_user, booking_id):
 
         new_status = data['status'].strip().lower()
 
-        ALLOWED_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
-        if new_status not in ALLOWED_STATUSES:
+        if new_status not in BOOKING_STATUSES:
             return jsonify({
                 'success': False,
-                'message': f'Invalid status. Allowed: {", ".join(ALLOWED_STATUSES)}'
+                'message': f'Invalid status. Allowed: {", ".join(BOOKING_STATUSES)}'
             }), 400
 
-        booking = Booking.query.get(booking_id)
-        if not booking:
+        def apply_status_change():
+            booking = db.session.get(Booking, booking_id)
+            if not booking:
+                return jsonify({
+                    'success': False,
+                    'message': 'Booking not found'
+                }), 404
+
+            interval_before = booking_interval(booking)
+            slot_before = (booking.status, booking.dentist_id, booking.preferred_date, booking.slot_start)
+
+            # Optional: allow updating time_slot when confirming
+            time_slot = data.get('time_slot')
+            if time_slot is not None:
+                booking.time_slot = time_slot.strip() or None
+
+            # Optional: assign (or with null, unassign) the dentist
+            if 'dentist_id' in data:
+                dentist_id = data['dentist_id']
+                if dentist_id is not None:
+                    dentist = db.session.get(Dentist, dentist_id)
+                    if not dentist or not dentist.is_active:
+                        return jsonify({'success': False, 'message': 'Selected dentist is not available'}), 400
+                    if not dentist.performs(booking.service_id):
+                        return jsonify({'success': False, 'message': 'Selected dentist does not perform this service'}), 400
+                booking.dentist_id = dentist_id
+
+            # If confirming, ensure we have a time slot
+            if new_status == 'confirmed' and not booking.time_slot:
+                return jsonify({
+                    'success': False,
+                    'message': 'Time slot is required when confirming a booking'
+                }), 400
+
+            # A booking that starts holding a new slot must find it free
+            slot_after = (new_status, booking.dentist_id, booking.preferred_date, booking.slot_start)
+            if (new_status in SLOT_HOLDING_STATUSES and booking.slot_start is not None
+                    and slot_after != slot_before):
+                reserve_booking_slot(booking, enforce_hours=False)
+
+            if booking.status != new_status:
+                record_booking_stat(booking, sign=-1)
+                record_booking_stat(booking, status=new_status)
+
+            booking.status = new_status
+            booking.updated_at = datetime.utcnow()
+
+            interval_after = booking_interval(booking)
+            calendar_versions = dentist_calendar.bump(interval_before, interval_after)
+
+            # Notification is sent by the outbox worker once this commits
+            queue_booking_status_email(booking)
+            db.session.commit()
+            dentist_calendar.apply(booking.id, interval_before, interval_after, calendar_versions)
+
+            return jsonify({
+                'success': True,
+                'message': f'Booking status updated to {new_status}',
+                'booking': booking.to_dict()
+            }), 200
+
+        return run_reservation(apply_status_change)
+
+    except SlotUnavailable as e:
+        db.session.rollback()
+        return slot_unavailable_response(e)
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Update Booking Status Error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to update booking status'
+        }), 500
+
+
+@app.route('/api/bookings/bulk-status', methods=['PATCH'])
+@role_required(['admin', 'moderator'])
+def bulk_update_booking_status(current_user):
+    """
+    Update many bookings in one transaction.
+
+    Body: {"items": [{"booking_id", "status", "time_slot"?, "dentist_id"?}, ...],
+           "atomic": false}
+    Every item is validated; valid ones are applied and committed together
+    and their notification emails are queued in the same transaction.
+    With atomic=true nothing is applied unless every item is valid.
+    Returns one result per item, in request order.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('items')
+        atomic = bool(data.get('atomic', False))
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'items must be a non-empty list'}), 400
+        if len(items) > app.config['BULK_BOOKINGS_MAX']:
             return jsonify({
                 'success': False,
-                'message': 'Booking not found'
-            }), 404
+                'message': f"At most {app.config['BULK_BOOKINGS_MAX']} items per request"
+            }), 400
+
+        def apply_bulk_change():
+            results = [None] * len(items)
+
+            def fail(index, booking_id, message, conflicting_booking_id=None):
+                results[index] = {'booking_id': booking_id, 'success': False, 'message': message}
+                if conflicting_booking_id:
+                    results[index]['conflicting_booking_id'] = conflicting_booking_id
+
+            # Parse and validate every item before touching anything
+            parsed = []
+            seen = set()
+            for index, item in enumerate(items):
+                booking_id = item.get('booking_id') if isinstance(item, dict) else None
+                if not isinstance(booking_id, int) or isinstance(booking_id, bool):
+                    fail(index, booking_id, 'booking_id is required')
+                    continue
+                if booking_id in seen:
+                    fail(index, booking_id, 'Duplicate booking_id in request')
+                    continue
+                seen.add(booking_id)
+                new_status = str(item.get('status') or '').strip().lower()
+                if new_status not in BOOKING_STATUSES:
+                    fail(index, booking_id, f'Invalid status. Allowed: {", ".join(BOOKING_STATUSES)}')
+                    continue
+                dentist_id = item.get('dentist_id')
+                if dentist_id is not None:
+                    # Coerce here so a bad value fails its own item, not the batch
+                    if isinstance(dentist_id, bool) or not str(dentist_id).strip().isdigit():
+                        fail(index, booking_id, 'dentist_id must be an integer')
+                        continue
+                    dentist_id = int(dentist_id)
+                parsed.append((index, booking_id, new_status, item, dentist_id))
+
+            bookings = {
+                booking.id: booking
+                for booking in Booking.query.filter(Booking.id.in_([entry[1] for entry in parsed])).all()
+            } if parsed else {}
+            dentist_ids = {entry[4] for entry in parsed if entry[4] is not None}
+            dentists = {
+                dentist.id: dentist
+                for dentist in Dentist.query.filter(Dentist.id.in_(dentist_ids)).all()
+            } if dentist_ids else {}
+
+            valid = []
+            for index, booking_id, new_status, item, dentist_id in parsed:
+                booking = bookings.get(booking_id)
+                if not booking:
+                    fail(index, booking_id, 'Booking not found')
+                    continue
+                time_slot = item.get('time_slot')
+                time_slot = (time_slot.strip() or None) if isinstance(time_slot, str) else booking.time_slot
+                if 'dentist_id' not in item:
+                    dentist_id = booking.dentist_id
+                elif dentist_id is not None:
+                    dentist = dentists.get(dentist_id)
+                    if not dentist or not dentist.is_active:
+                        fail(index, booking_id, 'Selected dentist is not available')
+                        continue
+                    if not dentist.performs(booking.service_id):
+                        fail(index, booking_id, 'Selected dentist does not perform this service')
+                        continue
+                if new_status == 'confirmed' and not time_slot:
+                    fail(index, booking_id, 'Time slot is required when confirming a booking')
+                    continue
+                valid.append((index, booking, new_status, time_slot, dentist_id))
+
+            # Bookings that give up their slot go first so later items may take it
+            claims = SlotClaims()
+            valid.sort(key=lambda entry: entry[2] in SLOT_HOLDING_STATUSES)
+            for _, booking, new_status, _, _ in valid:
+                if new_status not in SLOT_HOLDING_STATUSES and booking.status in SLOT_HOLDING_STATUSES:
+                    claims.release(booking.id)
+
+            deltas = {}
+            calendar_changes = []
+            now = datetime.utcnow()
+            for index, booking, new_status, time_slot, dentist_id in valid:
+                interval_before = booking_interval(booking)
+                slot_before = (booking.status, booking.dentist_id, booking.preferred_date, booking.slot_start)
+                old_time_slot, old_dentist_id = booking.time_slot, booking.dentist_id
+                booking.time_slot = time_slot
+                booking.dentist_id = dentist_id
+
+                slot_after = (new_status, booking.dentist_id, booking.preferred_date, booking.slot_start)
+                if (new_status in SLOT_HOLDING_STATUSES and booking.slot_start is not None
+                        and slot_after != slot_before):
+                    try:
+                        reserve_booking_slot(booking, enforce_hours=False, claims=claims)
+                    except SlotUnavailable as e:
+                        booking.time_slot, booking.dentist_id = old_time_slot, old_dentist_id
+                        fail(index, booking.id, e.message, e.conflicting_booking_id)
+                        continue
+
+                if booking.status != new_status:
+                    add_booking_stat_delta(deltas, booking, sign=-1)
+                    add_booking_stat_delta(deltas, booking, status=new_status)
+
+                booking.status = new_status
+                booking.updated_at = now
+                interval_after = booking_interval(booking)
+                calendar_changes.append((booking.id, interval_before, interval_after,
+                                         dentist_calendar.bump(interval_before, interval_after)))
+                queue_booking_status_email(booking)
+                results[index] = {'booking_id': booking.id, 'success': True}
+
+            failed = sum(1 for result in results if not result['success'])
+            if atomic and failed:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': 'No bookings were updated because some items are invalid',
+                    'updated': 0,
+                    'failed': failed,
+                    'results': results
+                }), 400
 
-        # Optional: allow updating time_slot when confirming
-        time_slot = data.get('time_slot')
-        if time_slot is not None:
-            booking.time_slot = time_slot.strip() or None
+            apply_booking_stat_deltas(deltas)
+            db.session.commit()
+            for change in calendar_changes:
+                dentist_calendar.apply(*change)
+
+            # Reload the committed rows in one query instead of one refresh per booking
+            updated_ids = [change[0] for change in calendar_changes]
+            if updated_ids:
+                refreshed = {
+                    booking.id: booking
+                    for booking in Booking.query.filter(Booking.id.in_(updated_ids)).all()
+                }
+                for result in results:
+                    if result['success']:
+                        result['booking'] = refreshed[result['booking_id']].to_dict()
 
-        # If confirming, ensure we have a time slot
-        if new_status == 'confirmed' and not booking.time_slot:
+            return jsonify({
+                'success': failed == 0,
+                'message': f'{len(updated_ids)} booking(s) updated, {failed} failed',
+                'updated': len(updated_ids),
+                'failed': failed,
+                'results': results
+            }), 200
+
+        return run_reservation(apply_bulk_change)
+
+    except SlotUnavailable as e:
+        db.session.rollback()
+        return slot_unavailable_response(e)
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Bulk Update Booking Status Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to update bookings'}), 500
+
+
+# ============================================================================
+# TIME SLOT AVAILABILITY
+# ============================================================================
+
+# Bookings in these statuses occupy their time slot
+SLOT_HOLDING_STATUSES = ('confirmed', 'completed')
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def parse_clock(value):
+    """Minutes since midnight for 'HH:MM' (24h) or 'H:MM AM/PM'; None if unparseable."""
+    text = (value or '').strip().upper().replace('.', '')
+    suffix = None
+    for marker in ('AM', 'PM'):
+        if text.endswith(marker):
+            suffix, text = marker, text[:-2].strip()
+    hours, _, minutes = text.partition(':')
+    try:
+        hours, minutes = int(hours), int(minutes or 0)
+    except ValueError:
+        return None
+    if suffix:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if suffix == 'PM' else 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+
+def parse_time_slot(time_slot):
+    """Start minute of a free-text booking time slot such as '10:30 AM' or '10:30-11:00'."""
+    if not time_slot:
+        return None
+    return parse_clock(time_slot.replace('–', '-').split('-')[0])
+
+
+def format_clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def clinic_hours():
+    """(open_minute, close_minute, open_weekdays) from configuration."""
+    open_minute = parse_clock(app.config['CLINIC_OPEN_TIME'])
+    close_minute = parse_clock(app.config['CLINIC_CLOSE_TIME'])
+    if open_minute is None or close_minute is None or close_minute <= open_minute:
+        raise ValueError('CLINIC_OPEN_TIME / CLINIC_CLOSE_TIME are invalid')
+    open_days = {
+        WEEKDAY_NAMES.index(day.strip().lower()[:3])
+        for day in app.config['CLINIC_OPEN_DAYS'].split(',')
+        if day.strip().lower()[:3] in WEEKDAY_NAMES
+    }
+    return open_minute, close_minute, open_days
+
+
+class DayOccupancy:
+    """
+    Occupancy bitmap of one clinic day.
+
+    The opening hours are split into SLOT_GRANULARITY_MINUTES cells and
+    each cell counts the appointments running in it. A cell is full once
+    it reaches the clinic capacity; a prefix sum over full cells answers
+    "is [start, end) free?" in O(1) per candidate slot.
+    """
+
+    def __init__(self, open_minute, close_minute, granularity, capacity):
+        self.open_minute = open_minute
+        self.close_minute = close_minute
+        self.granularity = granularity
+        self.capacity = capacity
+        self.counts = [0] * -(-(close_minute - open_minute) // granularity)
+        self._full_prefix = None
+
+    def add(self, start, duration):
+        """Mark [start, start + duration) as taken by one appointment."""
+        first = max(0, (start - self.open_minute) // self.granularity)
+        last = min(len(self.counts), -(-(start + duration - self.open_minute) // self.granularity))
+        for cell in range(first, last):
+            self.counts[cell] += 1
+        self._full_prefix = None
+
+    def is_free(self, start, duration):
+        """True if [start, start + duration) is inside opening hours with no full cell."""
+        if start < self.open_minute or start + duration > self.close_minute:
+            return False
+        first = (start - self.open_minute) // self.granularity
+        last = -(-(start + duration - self.open_minute) // self.granularity)
+        return all(count < self.capacity for count in self.counts[first:last])
+
+    def free_slots(self, duration, not_before=None):
+        """Start minutes, on the cell grid, of every free [start, start + duration)."""
+        if self._full_prefix is None:
+            prefix = [0]
+            for count in self.counts:
+                prefix.append(prefix[-1] + (count >= self.capacity))
+            self._full_prefix = prefix
+
+        cells = -(-duration // self.granularity)
+        slots = []
+        for first in range(0, len(self.counts) - cells + 1):
+            start = self.open_minute + first * self.granularity
+            if start + duration > self.close_minute:
+                break
+            if not_before is not None and start < not_before:
+                continue
+            if self._full_prefix[first + cells] == self._full_prefix[first]:
+                slots.append(start)
+        return slots
+
+
+def compute_availability(start_date, end_date, duration, dentist_id=None):
+    """
+    Free slots of `duration` minutes for every open day in [start_date, end_date].
+
+    Loads every slot-holding booking of the range in one query and fills a
+    DayOccupancy per day in memory, checked against CLINIC_CAPACITY. With
+    dentist_id a slot must also be free in a second DayOccupancy of that
+    dentist's bookings, where one appointment fills a cell.
+    Returns [{date, slots: [{start, end}]}].
+    """
+    open_minute, close_minute, open_days = clinic_hours()
+    granularity = app.config['SLOT_GRANULARITY_MINUTES']
+    default_minutes = app.config['DEFAULT_SERVICE_MINUTES']
+
+    days = OrderedDict()
+    dentist_days = {}
+    current = start_date
+    while current <= end_date:
+        if current.weekday() in open_days:
+            days[current] = DayOccupancy(open_minute, close_minute, granularity, app.config['CLINIC_CAPACITY'])
+            if dentist_id is not None:
+                dentist_days[current] = DayOccupancy(open_minute, close_minute, granularity, 1)
+        current += timedelta(days=1)
+
+    if days:
+        rows = db.session.query(
+            Booking.preferred_date, Booking.slot_start, Service.duration_minutes, Booking.dentist_id
+        ).join(Service, Service.id == Booking.service_id).filter(
+            Booking.preferred_date >= start_date,
+            Booking.preferred_date <= end_date,
+            Booking.status.in_(SLOT_HOLDING_STATUSES)
+        ).all()
+        for preferred_date, start, service_minutes, booking_dentist_id in rows:
+            if start is None or preferred_date not in days:
+                continue
+            days[preferred_date].add(start, service_minutes or default_minutes)
+            if dentist_id is not None and booking_dentist_id == dentist_id:
+                dentist_days[preferred_date].add(start, service_minutes or default_minutes)
+
+    # Slots that already started today are not offered
+    local_now = datetime.now(ZoneInfo(app.config['CLINIC_TIMEZONE']))
+    today, now_minute = local_now.date(), local_now.hour * 60 + local_now.minute
+
+    result = []
+    for day, occupancy in days.items():
+        if day < today:
+            continue
+        not_before = now_minute if day == today else None
+        starts = occupancy.free_slots(duration, not_before=not_before)
+        if dentist_id is not None:
+            dentist_free = set(dentist_days[day].free_slots(duration, not_before=not_before))
+            starts = [start for start in starts if start in dentist_free]
+        result.append({
+            'date': day.isoformat(),
+            'slots': [{'start': format_clock(start), 'end': format_clock(start + duration)} for start in starts]
+        })
+    return result
+
+
+class DayIntervals:
+    """
+    Sorted (start, end, booking_id) intervals of one dentist on one day.
+
+    max_ends[i] is the latest end among the first i + 1 intervals, so a
+    conflict lookup bisects to the last interval starting before `end` and
+    walks back only while an earlier interval can still reach `start`.
+    """
+
+    __slots__ = ('version', 'intervals', 'starts', 'max_ends')
+
+    def __init__(self, version, intervals):
+        self.version = version
+        self.intervals = sorted(intervals)
+        self._reindex()
+
+    def _reindex(self):
+        self.starts = [interval[0] for interval in self.intervals]
+        self.max_ends = list(accumulate((interval[1] for interval in self.intervals), max))
+
+    def add(self, start, end, booking_id):
+        insort(self.intervals, (start, end, booking_id))
+        self._reindex()
+
+    def remove(self, booking_id):
+        self.intervals = [interval for interval in self.intervals if interval[2] != booking_id]
+        self._reindex()
+
+    def conflict(self, start, end, exclude_booking_ids=()):
+        """Id of a booking overlapping [start, end), or None."""
+        index = bisect_left(self.starts, end) - 1
+        while index >= 0 and self.max_ends[index] > start:
+            other_start, other_end, booking_id = self.intervals[index]
+            if other_end > start and booking_id not in exclude_booking_ids:
+                return booking_id
+            index -= 1
+        return None
+
+
+def booking_interval(booking):
+    """(dentist_id, day, start, end) a booking occupies, or None if it holds no dentist time."""
+    if booking.dentist_id is None or booking.status not in SLOT_HOLDING_STATUSES:
+        return None
+    start = booking.slot_start
+    if start is None:
+        return None
+    duration = (booking.service.duration_minutes if booking.service else None) or app.config['DEFAULT_SERVICE_MINUTES']
+    return booking.dentist_id, booking.preferred_date, start, start + duration
+
+
+def booking_day_namespace(day):
+    return f"bookings:{day.isoformat()}"
+
+
+class DentistCalendarIndex:
+    """
+    Per-worker index of dentist appointments, one DayIntervals per (day, dentist).
+
+    Each day is versioned through cache_versions ('bookings:YYYY-MM-DD'),
+    bumped in the same transaction as any booking change on that day. A
+    worker applies its own changes to the loaded entries incrementally and
+    reloads a dentist's day from the database only when another worker
+    has changed that day since it was loaded. The least recently used
+    days are dropped beyond max_days.
+    """
+
+    def __init__(self, poll_seconds, max_days):
+        self.poll_seconds = poll_seconds
+        self.max_days = max_days
+        self._days = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _current_version(self, day, fresh=False):
+        namespace = booking_day_namespace(day)
+        with self._lock:
+            known = self._versions.get(namespace)
+        if not fresh and known and time.monotonic() - known[1] < self.poll_seconds:
+            return known[0]
+
+        version = db.session.query(CacheVersion.version).filter(
+            CacheVersion.name == namespace
+        ).scalar() or 0
+        if day in locked_day_versions():
+            # Our own lock_booking_day() bump, not a booking change yet
+            version -= 1
+        with self._lock:
+            self._versions[namespace] = (version, time.monotonic())
+        return version
+
+    def _load(self, dentist_id, day, version):
+        rows = db.session.query(
+            Booking.id, Booking.slot_start, Service.duration_minutes
+        ).join(Service, Service.id == Booking.service_id).filter(
+            Booking.dentist_id == dentist_id,
+            Booking.preferred_date == day,
+            Booking.status.in_(SLOT_HOLDING_STATUSES)
+        ).all()
+
+        intervals = []
+        for booking_id, start, service_minutes in rows:
+            if start is not None:
+                intervals.append((start, start + (service_minutes or app.config['DEFAULT_SERVICE_MINUTES']), booking_id))
+        return DayIntervals(version, intervals)
+
+    def get_day(self, dentist_id, day, fresh=False):
+        """DayIntervals for a dentist's day; fresh=True re-checks the version now."""
+        version = self._current_version(day, fresh)
+        with self._lock:
+            entry = self._days.get(day, {}).get(dentist_id)
+        if entry is not None and entry.version == version:
+            return entry
+
+        entry = self._load(dentist_id, day, version)
+        with self._lock:
+            self._days.setdefault(day, {})[dentist_id] = entry
+            self._days.move_to_end(day)
+            while len(self._days) > self.max_days:
+                evicted, _ = self._days.popitem(last=False)
+                self._versions.pop(booking_day_namespace(evicted), None)
+        return entry
+
+    def find_conflict(self, dentist_id, day, start, end, exclude_booking_ids=()):
+        """Id of a booking that overlaps [start, end) for the dentist, or None."""
+        return self.get_day(dentist_id, day, fresh=True).conflict(start, end, exclude_booking_ids)
+
+    def bump(self, before, after):
+        """
+        Bump the versions of the days a booking change touches.
+
+        Call inside the writing transaction with the booking_interval()
+        before and after the change; returns the versions to hand to
+        apply() once the transaction has committed.
+        """
+        if before == after:
+            return {}
+        days = {interval[1] for interval in (before, after) if interval}
+        # A day lock_booking_day already bumped keeps that version, so each
+        # change moves the day forward by exactly one
+        locked = locked_day_versions()
+        return {day: locked.pop(day, None) or bump_cache_version(booking_day_namespace(day))
+                for day in sorted(days)}
+
+    def apply(self, booking_id, before, after, versions):
+        """Update loaded entries after a committed booking change."""
+        with self._lock:
+            for day, version in versions.items():
+                self._versions[booking_day_namespace(day)] = (version, time.monotonic())
+                entries = self._days.get(day)
+                if not entries:
+                    continue
+                for dentist_id, entry in list(entries.items()):
+                    if entry.version != version - 1:
+                        # Another worker changed this day in between; reload on next use
+                        del entries[dentist_id]
+                        continue
+                    entry.remove(booking_id)
+                    if after and after[0] == dentist_id and after[1] == day:
+                        entry.add(after[2], after[3], booking_id)
+                    entry.version = version
+
+    def invalidate_dentist(self, dentist_id):
+        with self._lock:
+            for entries in self._days.values():
+                entries.pop(dentist_id, None)
+
+
+dentist_calendar = DentistCalendarIndex(app.config['CACHE_VERSION_POLL_SECONDS'], app.config['CALENDAR_INDEX_DAYS'])
+
+
+class SlotUnavailable(Exception):
+    """The requested appointment time is taken or outside opening hours."""
+
+    def __init__(self, message, conflicting_booking_id=None):
+        super().__init__(message)
+        self.message = message
+        self.conflicting_booking_id = conflicting_booking_id
+
+
+def slot_unavailable_response(error):
+    body = {'success': False, 'message': error.message}
+    if error.conflicting_booking_id:
+        body['conflicting_booking_id'] = error.conflicting_booking_id
+    return jsonify(body), 409
+
+
+def locked_day_versions():
+    """
+    Day versions bumped by lock_booking_day() in the current transaction
+    that no calendar change has used yet, keyed by day.
+    """
+    session = db.session()
+    transaction = session.get_transaction() or session.begin()
+    owner, versions = session.info.get('locked_day_versions', (None, None))
+    if owner is not transaction:
+        versions = {}
+        session.info['locked_day_versions'] = (transaction, versions)
+    return versions
+
+
+def lock_booking_day(day):
+    """
+    Serialize reservations for one day.
+
+    Every reservation, with or without a dentist, is checked against
+    CLINIC_CAPACITY, so reservations on the same day are checked one
+    writer at a time; other days are not blocked. Postgres uses a
+    transaction-scoped advisory lock. Other databases take their write
+    lock up front by bumping the day's calendar version; the
+    DentistCalendarIndex.bump() of the same transaction reuses that
+    version.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        locked = locked_day_versions()
+        if day not in locked:
+            locked[day] = bump_cache_version(booking_day_namespace(day))
+        return
+    db.session.execute(select(func.pg_advisory_xact_lock(
+        cast(literal(0), db.Integer), cast(literal(day.toordinal()), db.Integer)
+    )))
+
+
+class SlotClaims:
+    """
+    Slots released and claimed by earlier bookings of one transaction.
+
+    Lets reserve_booking_slot() check several bookings before any of them
+    is flushed: released bookings no longer count, claimed slots do.
+    """
+
+    def __init__(self):
+        self.released = set()
+        self.claimed = {}
+
+    def release(self, booking_id):
+        self.released.add(booking_id)
+
+    def claim(self, dentist_id, day, start, end, booking_id):
+        self.claimed.setdefault(day, []).append((dentist_id, start, end, booking_id))
+
+
+def reserve_booking_slot(booking, enforce_hours=True, claims=None):
+    """
+    Check under the day lock that a booking's new slot is free.
+
+    Call inside the writing transaction once the booking carries its new
+    dentist, date, time and status, before committing. Raises
+    SlotUnavailable. Dentist bookings are checked against that dentist's
+    intervals, and every booking against CLINIC_CAPACITY (the chairs /
+    dentists on shift), which dentist and unassigned bookings share. Pass
+    a SlotClaims to check several bookings in one transaction.
+    """
+    start = booking.slot_start
+    if start is None:
+        raise SlotUnavailable('A time slot such as 10:30 is required')
+    # A new booking is not in the session yet; its service is in the identity map
+    service = booking.service or db.session.get(Service, booking.service_id)
+    duration = (service.duration_minutes if service else None) or app.config['DEFAULT_SERVICE_MINUTES']
+    open_minute, close_minute, open_days = clinic_hours()
+    if enforce_hours and (booking.preferred_date.weekday() not in open_days
+                          or start < open_minute or start + duration > close_minute):
+        raise SlotUnavailable('The clinic is closed at that time')
+
+    excluded = set(claims.released) if claims else set()
+    if booking.id is not None:
+        excluded.add(booking.id)
+    claimed = claims.claimed.get(booking.preferred_date, []) if claims else []
+
+    # The booking's own pending changes must not be flushed by the checks below
+    with db.session.no_autoflush:
+        lock_booking_day(booking.preferred_date)
+
+        if booking.dentist_id is not None:
+            conflict_id = dentist_calendar.find_conflict(
+                booking.dentist_id, booking.preferred_date, start, start + duration, exclude_booking_ids=excluded
+            ) or next((
+                other_id for dentist_id, other_start, other_end, other_id in claimed
+                if dentist_id == booking.dentist_id and other_start < start + duration and other_end > start
+            ), None)
+            if conflict_id:
+                raise SlotUnavailable('The dentist already has an appointment at that time', conflict_id)
+
+        query = db.session.query(Booking.slot_start, Service.duration_minutes).join(
+            Service, Service.id == Booking.service_id
+        ).filter(
+            Booking.preferred_date == booking.preferred_date,
+            Booking.status.in_(SLOT_HOLDING_STATUSES),
+            Booking.slot_start.isnot(None)
+        )
+        if excluded:
+            query = query.filter(Booking.id.notin_(excluded))
+
+        # One-minute cells so off-grid times are checked exactly
+        occupancy = DayOccupancy(min(open_minute, start), max(close_minute, start + duration),
+                                 1, app.config['CLINIC_CAPACITY'])
+        for other_start, other_minutes in query.all():
+            occupancy.add(other_start, other_minutes or app.config['DEFAULT_SERVICE_MINUTES'])
+        for _, other_start, other_end, _ in claimed:
+            occupancy.add(other_start, other_end - other_start)
+        if not occupancy.is_free(start, duration):
+            raise SlotUnavailable('That time slot is fully booked')
+        if claims:
+            claims.claim(booking.dentist_id, booking.preferred_date, start, start + duration, booking.id)
+
+
+def is_retryable_conflict(error):
+    """Unique violation, serialization failure or deadlock (or SQLite's lock timeout)."""
+    code = getattr(error.orig, 'pgcode', None) or getattr(error.orig, 'sqlstate', None)
+    if code:
+        return code in ('23505', '40001', '40P01')
+    message = str(error.orig).lower()
+    return 'unique constraint' in message or 'database is locked' in message
+
+
+def run_reservation(work):
+    """
+    Run work(), which writes and commits a reservation, retrying conflicts.
+
+    A losing concurrent insert hits uq_bookings_dentist_slot_held; the
+    retry then sees the winner and raises SlotUnavailable from its own
+    check. Retries back off with jitter.
+    """
+    attempts = max(1, app.config['RESERVATION_RETRIES'])
+    for attempt in range(1, attempts + 1):
+        try:
+            return work()
+        except (IntegrityError, OperationalError) as e:
+            db.session.rollback()
+            if not is_retryable_conflict(e):
+                raise
+            if attempt == attempts:
+                raise SlotUnavailable('That time slot was just taken, please choose another')
+            time.sleep(random.uniform(0, app.config['RESERVATION_RETRY_BASE_MS'] * 2 ** (attempt - 1)) / 1000)
+
+
+@app.route('/api/public/reservations', methods=['POST'])
+@idempotent('public_reservations')
+def create_public_reservation():
+    """
+    Book a specific free slot (from /api/time-slots/available) as confirmed.
+    No authentication required.
+
+    Concurrent requests for the same slot get exactly one 201; the rest
+    get 409.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': 'No data provided'}), 400
+
+        customer_name = data.get('name', '').strip()
+        customer_email = data.get('email', '').strip().lower()
+        customer_phone = data.get('phone', '').strip()
+        service_id = data.get('service_id')
+        dentist_id = data.get('dentist_id') or None
+        preferred_date_str = data.get('preferred_date', '').strip()
+        time_slot = data.get('time_slot', '').strip() or None
+        notes = data.get('notes', '').strip() or None
+
+        if not all([customer_name, customer_email, customer_phone, service_id, preferred_date_str, time_slot]):
             return jsonify({
                 'success': False,
-                'message': 'Time slot is required when confirming a booking'
+                'message': 'Name, email, phone, service, date and time slot are required'
             }), 400
+        if dentist_id is not None and (not isinstance(dentist_id, int) or isinstance(dentist_id, bool)):
+            return jsonify({'success': False, 'message': 'dentist_id must be an integer'}), 400
 
-        booking.status = new_status
-        booking.updated_at = datetime.utcnow()
+        try:
+            preferred_date = datetime.fromisoformat(preferred_date_str).date()
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid preferred_date format. Use ISO date (YYYY-MM-DD).'}), 400
+
+        slot_start = parse_time_slot(time_slot)
+        if slot_start is None:
+            return jsonify({'success': False, 'message': 'Invalid time_slot. Use HH:MM.'}), 400
+
+        local_now = datetime.now(ZoneInfo(app.config['CLINIC_TIMEZONE']))
+        if (preferred_date, slot_start) < (local_now.date(), local_now.hour * 60 + local_now.minute):
+            return jsonify({'success': False, 'message': 'That time slot is in the past'}), 400
+
+        def reserve():
+            service = db.session.get(Service, service_id)
+            if not service or not service.is_active:
+                return jsonify({'success': False, 'message': 'Selected service is not available'}), 400
+            if dentist_id is not None:
+                dentist = db.session.get(Dentist, dentist_id)
+                if not dentist or not dentist.is_active or not dentist.performs(service.id):
+                    return jsonify({'success': False, 'message': 'Selected dentist is not available for this service'}), 400
+
+            booking = Booking(
+                customer_name=customer_name,
+                customer_email=customer_email,
+                customer_phone=customer_phone,
+                service_id=service.id,
+                dentist_id=dentist_id,
+                preferred_date=preferred_date,
+                status='confirmed',
+                price=service.price,
+                notes=notes
+            )
+            booking.time_slot = time_slot
+
+            reserve_booking_slot(booking)
+            db.session.add(booking)
+            db.session.flush()
+            record_booking_stat(booking)
+            interval = booking_interval(booking)
+            calendar_versions = dentist_calendar.bump(None, interval)
+            queue_booking_status_email(booking)
+            payload = {
+                'success': True,
+                'message': 'Appointment confirmed',
+                'booking': booking.to_dict()
+            }
+            record_idempotent_response(payload, 201)
+            db.session.commit()
+            dentist_calendar.apply(booking.id, None, interval, calendar_versions)
+
+            return jsonify(payload), 201
+
+        return run_reservation(reserve)
+
+    except SlotUnavailable as e:
+        db.session.rollback()
+        return slot_unavailable_response(e)
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Create Reservation Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to reserve time slot'}), 500
+
+
+@app.route('/api/time-slots/available', methods=['GET'])
+def available_time_slots():
+    """
+    Free appointment slots for a date or a date range.
+
+    Query params:
+    - date: single day (YYYY-MM-DD), or start and end for an inclusive range
+    - service_id: use the service's duration (defaults to DEFAULT_SERVICE_MINUTES)
+    - dentist_id: slots where that dentist is free too (clinic-wide capacity always applies)
+    """
+    try:
+        date_str = request.args.get('date')
+        start_str = request.args.get('start', date_str)
+        end_str = request.args.get('end', start_str)
+        if not start_str:
+            return jsonify({'success': False, 'message': 'date (or start and end) is required'}), 400
+
+        try:
+            start_date = datetime.fromisoformat(start_str).date()
+            end_date = datetime.fromisoformat(end_str).date()
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid date format. Use ISO date (YYYY-MM-DD).'}), 400
+
+        if end_date < start_date:
+            return jsonify({'success': False, 'message': 'end must not be before start'}), 400
+        if (end_date - start_date).days + 1 > app.config['MAX_AVAILABILITY_DAYS']:
+            return jsonify({
+                'success': False,
+                'message': f"Date range is limited to {app.config['MAX_AVAILABILITY_DAYS']} days"
+            }), 400
+
+        duration = app.config['DEFAULT_SERVICE_MINUTES']
+        service_id = request.args.get('service_id', type=int)
+        if service_id is not None:
+            service = db.session.get(Service, service_id)
+            if not service or not service.is_active:
+                return jsonify({'success': False, 'message': 'Selected service is not available'}), 400
+            duration = service.duration_minutes or duration
+
+        dentist_id = request.args.get('dentist_id', type=int)
+        if dentist_id is not None:
+            dentist = db.session.get(Dentist, dentist_id)
+            if not dentist or not dentist.is_active:
+                return jsonify({'success': False, 'message': 'Selected dentist is not available'}), 400
+            if service_id is not None and not dentist.performs(service_id):
+                return jsonify({'success': False, 'message': 'Selected dentist does not perform this service'}), 400
+
+        days = compute_availability(start_date, end_date, duration, dentist_id)
+
+        response = {
+            'success': True,
+            'duration_minutes': duration,
+            'days': days
+        }
+        if date_str:
+            response['date'] = start_date.isoformat()
+            response['slots'] = days[0]['slots'] if days else []
+        return jsonify(response), 200
+
+    except Exception as e:
+        print(f"❌ Available Time Slots Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to load available time slots'}), 500
+
+
+# ============================================================================
+# DENTISTS
+# ============================================================================
+
+def parse_service_ids(values):
+    """Service ids from repeated form fields and/or comma-separated values."""
+    ids = []
+    for value in values:
+        for part in str(value).split(','):
+            if part.strip():
+                ids.append(int(part))
+    return ids
+
+
+def apply_dentist_form(dentist, form, files):
+    """Copy dentist fields present in a multipart form; returns an error message or None."""
+    for field in ('name', 'specialty', 'bio', 'email', 'phone'):
+        if field in form:
+            value = form.get(field, '').strip()
+            setattr(dentist, field, value if field == 'name' else value or None)
+    if 'is_active' in form:
+        dentist.is_active = form.get('is_active', 'true').lower() in ('true', '1', 'yes', 'on')
+
+    if 'service_ids' in form:
+        try:
+            service_ids = parse_service_ids(form.getlist('service_ids'))
+        except ValueError:
+            return 'service_ids must be integers'
+        services = Service.query.filter(Service.id.in_(service_ids)).all() if service_ids else []
+        if len(services) != len(set(service_ids)):
+            return 'Unknown service in service_ids'
+        dentist.services = services
+
+    file = files.get('photo_file')
+    if file and file.filename:
+        if not allowed_file(file.filename):
+            return 'File type not allowed'
+        filename = secure_filename(file.filename)
+        filename = f"dentist_{int(datetime.utcnow().timestamp())}_{filename}"
+        dentist.photo_url = store_upload(f"dentists/{filename}", file.stream)
+
+    if not dentist.name:
+        return 'Dentist name is required'
+    return None
+
+
+@app.route('/api/dentists', methods=['GET'])
+def get_dentists():
+    """Get all dentists (public endpoint, optionally filter by active status)."""
+    try:
+        active_only = request.args.get('active', 'true').lower() == 'true'
+
+        def build_payload():
+            query = Dentist.query
+            if active_only:
+                query = query.filter_by(is_active=True)
+
+            dentists = query.order_by(Dentist.name.asc(), Dentist.id.asc()).all()
+            last_modified = max((d.updated_at for d in dentists if d.updated_at), default=None)
+            return {'success': True, 'dentists': [d.to_dict() for d in dentists]}, last_modified
+
+        return cached_json_response('dentists', active_only, build_payload)
+
+    except Exception as e:
+        print(f"❌ Get Dentists Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to fetch dentists'}), 500
+
+
+@app.route('/api/dentists', methods=['POST'])
+@role_required(['admin'])
+def create_dentist(current_user):
+    """Create a dentist from multipart form data (optional photo_file) - Admin only."""
+    try:
+        dentist = Dentist(name=request.form.get('name', '').strip())
+        error = apply_dentist_form(dentist, request.form, request.files)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+
+        db.session.add(dentist)
+        bump_cache_version('dentists')
+        db.session.commit()
+        public_cache.invalidate('dentists')
+
+        return jsonify({
+            'success': True,
+            'message': 'Dentist created successfully',
+            'dentist': dentist.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Create Dentist Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to create dentist'}), 500
+
+
+@app.route('/api/dentists/<int:dentist_id>', methods=['PUT'])
+@role_required(['admin'])
+def update_dentist(current_user, dentist_id):
+    """Update a dentist from multipart form data - Admin only."""
+    try:
+        dentist = db.session.get(Dentist, dentist_id)
+        if not dentist:
+            return jsonify({'success': False, 'message': 'Dentist not found'}), 404
+
+        error = apply_dentist_form(dentist, request.form, request.files)
+        if error:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': error}), 400
+
+        dentist.updated_at = datetime.utcnow()
+        bump_cache_version('dentists')
         db.session.commit()
+        public_cache.invalidate('dentists')
 
-        # Send notification email
-        send_booking_status_email(booking)
+        return jsonify({
+            'success': True,
+            'message': 'Dentist updated successfully',
+            'dentist': dentist.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Update Dentist Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to update dentist'}), 500
+
+
+@app.route('/api/dentists/<int:dentist_id>', methods=['DELETE'])
+@role_required(['admin'])
+def delete_dentist(current_user, dentist_id):
+    """Delete a dentist; their bookings become unassigned - Admin only."""
+    try:
+        dentist = db.session.get(Dentist, dentist_id)
+        if not dentist:
+            return jsonify({'success': False, 'message': 'Dentist not found'}), 404
+
+        # Other workers must drop this dentist's intervals for the affected days too
+        days = [day for (day,) in db.session.query(Booking.preferred_date).filter(
+            Booking.dentist_id == dentist_id
+        ).distinct()]
+        for day in days:
+            bump_cache_version(booking_day_namespace(day))
+
+        db.session.execute(
+            update(Booking).where(Booking.dentist_id == dentist_id).values(dentist_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.delete(dentist)
+        bump_cache_version('dentists')
+        db.session.commit()
+        public_cache.invalidate('dentists')
+        dentist_calendar.invalidate_dentist(dentist_id)
 
         return jsonify({
             'success': True,
-            'message': f'Booking status updated to {new_status}',
-            'booking': booking.to_dict()
+            'message': 'Dentist deleted successfully'
         }), 200
 
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Update Booking Status Error: {str(e)}")
+        print(f"❌ Delete Dentist Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to delete dentist'}), 500
+
+
+@app.route('/api/dentists/calendar', methods=['GET'])
+@role_required(['admin', 'moderator'])
+def dentist_calendar_view(current_user):
+    """
+    Appointments of every active dentist for a day (or start/end range).
+
+    The bookings of all chairs come from one range query over
+    ix_bookings_dentist_id_preferred_date.
+    """
+    try:
+        date_str = request.args.get('date') or request.args.get('start')
+        if not date_str:
+            return jsonify({'success': False, 'message': 'date (or start and end) is required'}), 400
+        try:
+            start_date = datetime.fromisoformat(date_str).date()
+            end_date = datetime.fromisoformat(request.args.get('end', date_str)).date()
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid date format. Use ISO date (YYYY-MM-DD).'}), 400
+        if end_date < start_date or (end_date - start_date).days + 1 > app.config['MAX_AVAILABILITY_DAYS']:
+            return jsonify({
+                'success': False,
+                'message': f"end must be on or after start, within {app.config['MAX_AVAILABILITY_DAYS']} days"
+            }), 400
+
+        dentists = Dentist.query.filter_by(is_active=True).order_by(Dentist.name.asc(), Dentist.id.asc()).all()
+        calendar = OrderedDict(
+            (dentist.id, {'dentist': {'id': dentist.id, 'name': dentist.name, 'specialty': dentist.specialty},
+                          'appointments': []})
+            for dentist in dentists
+        )
+
+        if calendar:
+            bookings = Booking.query.filter(
+                Booking.dentist_id.in_(list(calendar)),
+                Booking.preferred_date >= start_date,
+                Booking.preferred_date <= end_date,
+                Booking.status != 'cancelled'
+            ).all()
+
+            default_minutes = app.config['DEFAULT_SERVICE_MINUTES']
+            for booking in bookings:
+                start = booking.slot_start
+                duration = (booking.service.duration_minutes if booking.service else None) or default_minutes
+                calendar[booking.dentist_id]['appointments'].append({
+                    'booking_id': booking.id,
+                    'date': booking.preferred_date.isoformat(),
+                    'start': format_clock(start) if start is not None else None,
+                    'end': format_clock(start + duration) if start is not None else None,
+                    'time_slot': booking.time_slot,
+                    'status': booking.status,
+                    'customer_name': booking.customer_name,
+                    'service_name': booking.service.name if booking.service else None
+                })
+
+            for entry in calendar.values():
+                entry['appointments'].sort(key=lambda a: (a['date'], a['start'] or '99:99', a['booking_id']))
+
         return jsonify({
-            'success': False,
-            'message': 'Failed to update booking status'
-        }), 500
+            'success': True,
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'dentists': list(calendar.values())
+        }), 200
+
+    except Exception as e:
+        print(f"❌ Dentist Calendar Error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to load dentist calendar'}), 500
 
 
 # ============================================================================
@@ -1498,7 +4873,9 @@ def seed_admin_user():
             if existing_admin.status != 'admin':
                 existing_admin.status = 'admin'
                 existing_admin.is_verified = True
+                bump_cache_version(AUTH_CACHE_NAMESPACE)
                 db.session.commit()
+                auth_user_cache.invalidate(existing_admin.id)
                 print(f"✅ Existing user {admin_email} promoted to admin.")
             else:
                 print(f"ℹ️ Admin already exists: {admin_email}")
@@ -1514,6 +4891,8 @@ def seed_admin_user():
             is_verified=True
         )
         db.session.add(admin_user)
+        db.session.flush()
+        record_registration_stat(admin_user)
         db.session.commit()
         print(f"✅ Admin user created successfully: {admin_email}")
         
@@ -1521,14 +4900,37 @@ def seed_admin_user():
         db.session.rollback()
         print(f"❌ Error during seeding: {str(e)}")
 
-# This block ensures tables are created and seeded on startup
-with app.app_context():
-    try:
-        db.create_all()
-        seed_admin_user()
-        print("✅ Database initialized successfully")
-    except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
+
+# Schema as it was when tables were still created with db.create_all()
+BASELINE_REVISION = '0001_baseline'
+
+
+def init_db():
+    """
+    Bring the schema up to the latest migration.
+
+    Databases created by the old import-time db.create_all() have tables but
+    no alembic_version row; they are stamped at the baseline revision first.
+    """
+    tables = inspect(db.engine).get_table_names()
+    if 'users' in tables and 'alembic_version' not in tables:
+        print("ℹ️ Existing schema without migration history, stamping baseline")
+        migrate_stamp(revision=BASELINE_REVISION)
+    migrate_upgrade()
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Apply database migrations (run once per deploy, not per worker)."""
+    init_db()
+    print("✅ Database initialized successfully")
+
+
+@app.cli.command('seed-admin')
+def seed_admin_command():
+    """Create or promote the admin user from ADMIN_EMAIL/ADMIN_PASSWORD."""
+    seed_admin_user()
+
 
 # ============================================================================
 # RUN APPLICATION
@@ -1537,14 +4939,12 @@ with app.app_context():
 if __name__ == '__main__':
     with app.app_context():
         try:
-            # 1. Ensure the DB connection is ready and create tables
+            # Development entry point: migrate and seed in-process.
+            # Production runs `flask init-db` and `flask seed-admin` once per deploy.
             print("⏳ Initializing database...")
-            db.create_all()
-            print("✅ Database tables confirmed/created.")
-            
-            # 2. Check for Admin (Optional but recommended)
-            # You could add logic here to create the first admin 
-            # using os.environ.get('ADMIN_EMAIL')
+            init_db()
+            seed_admin_user()
+            print("✅ Database migrated and seeded.")
             
         except Exception as e:
             print(f"❌ Database initialization failed: {e}")
@@ -0,0 +1,86 @@
+"""
+Gunicorn production serving profile for the clinic API.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Worker model and sizing are chosen with environment variables:
+
+    GUNICORN_WORKER_CLASS   sync | gthread | gevent (default gthread)
+    GUNICORN_WORKERS        default 2 * CPU count + 1
+    GUNICORN_THREADS        threads per gthread worker (default 4)
+    GUNICORN_CONNECTIONS    concurrent greenlets per gevent worker (default 100)
+
+The SQLAlchemy pool of each worker is sized from the same numbers, so
+every request that can run concurrently inside a worker can hold a
+connection without waiting on the pool. Each worker also has its own
+password hashing pool, so KDF_WORKERS defaults to the CPU count split
+across the workers (at least one) instead of oversubscribing the CPUs.
+"""
+import multiprocessing
+import os
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class not in WORKER_CLASSES:
+    raise RuntimeError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}")
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:4000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_CONNECTIONS', 100))
+
+# Import the app once in the master and fork it into workers
+preload_app = True
+
+# Recycle workers periodically to bound memory growth; jitter avoids
+# every worker restarting at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+
+# Database connections one worker can use at once. gevent workers are
+# capped because Postgres, not the greenlet count, is the real limit.
+if worker_class == 'gthread':
+    worker_concurrency = threads
+elif worker_class == 'gevent':
+    worker_concurrency = min(worker_connections, int(os.environ.get('GEVENT_DB_POOL_MAX', 20)))
+else:
+    worker_concurrency = 1
+
+# Read by app.py when it builds SQLALCHEMY_ENGINE_OPTIONS
+os.environ.setdefault('DB_POOL_SIZE', str(worker_concurrency))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(max(2, worker_concurrency // 2)))
+
+# Read by app.py for the per-worker password hashing pool
+os.environ.setdefault('KDF_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+# preload_app imports app.py once in the master. A fork copies its objects
+# but not its threads, and copied sockets would be shared between
+# processes, so every worker needs its own executors, background threads
+# and connection pools. post_fork resets the database pool; KdfPool,
+# ImageDerivativePipeline, LastLoginBuffer and S3Storage remember the pid
+# that created their resources and build new ones on first use in a worker.
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # Make psycopg2 cooperate with the gevent hub instead of blocking it
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    # Connections opened by the master while preloading must not be shared
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Write buffered last-login timestamps before the worker goes away
+    from app import flush_last_logins
+    flush_last_logins()
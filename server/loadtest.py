@@ -0,0 +1,342 @@
+"""
+Throughput benchmark for the public read endpoints.
+
+For each gunicorn worker model it starts the server with gunicorn.conf.py,
+hammers /api/services and /api/public/content with keep-alive clients and
+reports requests per second and latency percentiles:
+
+    python loadtest.py --worker-classes sync,gthread,gevent --duration 10 --concurrency 32
+
+Pass --url to benchmark an already running server instead. The spawned
+servers use the DATABASE_URL of the current environment.
+
+--login-storm EMAIL measures /api/services while other clients keep
+POSTing wrong passwords for that (existing) account, which shows whether
+password hashing starves the read endpoints:
+
+    python loadtest.py --worker-classes gthread --login-storm admin@example.com
+
+--reservation-storm fires --requests parallel POST /api/public/reservations
+at one slot and checks that exactly one of them wins:
+
+    python loadtest.py --reservation-storm --service-id 1 --dentist-id 2 \
+        --date 2026-11-02 --time-slot 10:00 --requests 500 --concurrency 64
+
+With --capacity N (the server's CLINIC_CAPACITY) every other request
+leaves out the dentist, so dentist and unassigned bookings race for the
+same time. It then checks at most one dentist booking and at most N
+bookings in all, since dentist and unassigned bookings share the
+clinic's capacity.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ['/api/services', '/api/public/content']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_healthy(base_url, timeout=30):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server at {base_url} did not become healthy')
+
+
+def start_server(worker_class, port, workers=None):
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_ACCESSLOG='')
+    if workers:
+        env['GUNICORN_WORKERS'] = str(workers)
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=server_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(base_url, path, duration, concurrency, headers=None):
+    """Run `concurrency` keep-alive clients against one path for `duration` seconds."""
+    parts = urlsplit(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local, local_errors = [], 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def run_login_storm(base_url, email, concurrency, stop_event):
+    """POST failing logins for `email` until stop_event is set; returns status counts."""
+    parts = urlsplit(base_url)
+    body = json.dumps({'email': email, 'password': 'wrong-password'})
+    statuses = {}
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local = {}
+        while not stop_event.is_set():
+            try:
+                conn.request('POST', '/api/auth/login', body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                local[response.status] = local.get(response.status, 0) + 1
+            except (OSError, http.client.HTTPException):
+                local['error'] = local.get('error', 0) + 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        conn.close()
+        with lock:
+            for status, count in local.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    return threads, statuses
+
+
+def benchmark_login_storm(label, base_url, args):
+    """Compare /api/services latency with and without a concurrent login storm."""
+    print_result(label, '/api/services', run_load(base_url, '/api/services', args.duration, args.concurrency))
+
+    stop_event = threading.Event()
+    threads, statuses = run_login_storm(base_url, args.login_storm, args.storm_concurrency, stop_event)
+    try:
+        result = run_load(base_url, '/api/services', args.duration, args.concurrency)
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    print_result(f'{label}+storm', '/api/services', result)
+    print(f"{'':<10} login responses during storm: "
+          + ', '.join(f'{status}={count}' for status, count in sorted(statuses.items(), key=str)))
+
+
+def run_reservation_storm(base_url, args):
+    """POST args.requests reservations for one slot from args.concurrency clients."""
+    parts = urlsplit(base_url)
+    statuses, latencies, winners = {}, [], []
+    lock = threading.Lock()
+    remaining = [args.requests]
+    go = threading.Event()
+
+    def client(index):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        local_statuses, local_latencies, local_winners = {}, [], []
+        go.wait()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+                n = remaining[0]
+            body = {
+                'name': f'Load Test {n}', 'email': f'loadtest{n}@example.com', 'phone': '000',
+                'service_id': args.service_id, 'preferred_date': args.date, 'time_slot': args.time_slot
+            }
+            assigned = bool(args.dentist_id) and not (args.capacity and n % 2)
+            if assigned:
+                body['dentist_id'] = args.dentist_id
+            started = time.perf_counter()
+            try:
+                conn.request('POST', '/api/public/reservations', body=json.dumps(body),
+                             headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                payload = response.read()
+                status = response.status
+                if status == 201:
+                    local_winners.append((json.loads(payload)['booking']['id'], assigned))
+            except (OSError, http.client.HTTPException):
+                status = 'error'
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            winners.extend(local_winners)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.monotonic()
+    go.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status not in (201, 409)),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'statuses': statuses,
+        'winners': sorted(winners),
+    }
+
+
+def benchmark_reservation_storm(label, base_url, args):
+    result = run_reservation_storm(base_url, args)
+    print_result(label, '/api/public/reservations', result)
+    winners = result['winners']
+    if args.capacity:
+        dentist_winners = sum(1 for _, assigned in winners if assigned)
+        overbooked = [booking_id for booking_id, _ in winners[args.capacity:]]
+        ok = bool(winners) and dentist_winners <= 1 and not overbooked
+        verdict = (f'{len(winners)} reservations ({dentist_winners} with the dentist), capacity {args.capacity}'
+                   + (f', over capacity: {overbooked}' if overbooked else ''))
+    else:
+        ok = len(winners) == 1
+        verdict = 'exactly one reservation' if ok else f'{len(winners)} reservations'
+    print(f"{'':<10} responses: "
+          + ', '.join(f'{status}={count}' for status, count in sorted(result['statuses'].items(), key=str))
+          + f" -> {'OK' if ok else 'FAILED'}, {verdict}")
+    return ok
+
+
+def print_result(label, path, result):
+    print(f"{label:<10} {path:<24} {result['rps']:>10.1f} {result['p50']:>9.2f} "
+          f"{result['p99']:>9.2f} {result['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--worker-classes', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=None, help='Override GUNICORN_WORKERS')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--paths', default=','.join(DEFAULT_PATHS))
+    parser.add_argument('--url', default=None, help='Benchmark a running server instead of spawning gunicorn')
+    parser.add_argument('--login-storm', metavar='EMAIL', default=None,
+                        help='Measure /api/services during a failed-login storm against this account')
+    parser.add_argument('--storm-concurrency', type=int, default=64)
+    parser.add_argument('--reservation-storm', action='store_true',
+                        help='Race --requests reservations for one slot and check a single winner')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--service-id', type=int)
+    parser.add_argument('--dentist-id', type=int)
+    parser.add_argument('--date', help='Slot date (YYYY-MM-DD); use a fresh slot for every run')
+    parser.add_argument('--time-slot', default='10:00')
+    parser.add_argument('--capacity', type=int, default=None,
+                        help="Server's CLINIC_CAPACITY; mixes unassigned requests into the storm")
+    args = parser.parse_args()
+    if args.reservation_storm and not (args.service_id and args.date):
+        parser.error('--reservation-storm needs --service-id and --date')
+    if args.capacity and not args.dentist_id:
+        parser.error('--capacity mixes dentist and unassigned requests; pass --dentist-id too')
+    if args.reservation_storm and not args.url and ',' in args.worker_classes:
+        parser.error('--reservation-storm books its slot once; pass a single --worker-classes value')
+
+    paths = [path for path in args.paths.split(',') if path]
+    print(f"{'workers':<10} {'path':<24} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+    if args.url:
+        if args.reservation_storm:
+            sys.exit(0 if benchmark_reservation_storm('external', args.url, args) else 1)
+        if args.login_storm:
+            benchmark_login_storm('external', args.url, args)
+            return
+        for path in paths:
+            print_result('external', path, run_load(args.url, path, args.duration, args.concurrency))
+        return
+
+    for worker_class in args.worker_classes.split(','):
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        process = start_server(worker_class, port, args.workers)
+        try:
+            wait_until_healthy(base_url)
+            if args.reservation_storm:
+                benchmark_reservation_storm(worker_class, base_url, args)
+                continue
+            if args.login_storm:
+                benchmark_login_storm(worker_class, base_url, args)
+                continue
+            for path in paths:
+                print_result(worker_class, path, run_load(base_url, path, args.duration, args.concurrency))
+        finally:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
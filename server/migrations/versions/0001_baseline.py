@@ -0,0 +1,100 @@
+"""Baseline schema (tables previously created by db.create_all())
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default='user', nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('verification_code', sa.String(length=6), nullable=True),
+    sa.Column('code_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_login', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+
+    op.create_table('services',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), server_default='true', nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('bookings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('customer_name', sa.String(length=120), nullable=False),
+    sa.Column('customer_email', sa.String(length=120), nullable=False),
+    sa.Column('customer_phone', sa.String(length=50), nullable=False),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('preferred_date', sa.Date(), nullable=False),
+    sa.Column('time_slot', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), server_default='pending', nullable=True),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['service_id'], ['services.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_bookings_service_id'), ['service_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_bookings_user_id'), ['user_id'], unique=False)
+
+    op.create_table('content_blocks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('media_url', sa.String(length=500), nullable=True),
+    sa.Column('updated_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['updated_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('content_blocks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_content_blocks_key'), ['key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('content_blocks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_content_blocks_key'))
+    op.drop_table('content_blocks')
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bookings_user_id'))
+        batch_op.drop_index(batch_op.f('ix_bookings_service_id'))
+    op.drop_table('bookings')
+
+    op.drop_table('services')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+    op.drop_table('users')
@@ -0,0 +1,45 @@
+"""Keyset pagination indexes on bookings, built concurrently on Postgres
+
+Revision ID: 0003_booking_keyset_indexes
+Revises: 0002_rollup_auth_outbox
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_booking_keyset_indexes'
+down_revision = '0002_rollup_auth_outbox'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_bookings_created_at_id', ['created_at', 'id']),
+    ('ix_bookings_status_created_at_id', ['status', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction and does
+        # not block writes to bookings while it builds
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, 'bookings', columns, unique=False,
+                                postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, 'bookings', columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, _ in reversed(INDEXES):
+                op.drop_index(name, table_name='bookings', postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='bookings')
@@ -0,0 +1,38 @@
+"""Index bookings on (preferred_date, status) for slot availability lookups
+
+Revision ID: 0004_booking_date_status_index
+Revises: 0003_booking_keyset_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_booking_date_status_index'
+down_revision = '0003_booking_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+INDEX_NAME = 'ix_bookings_preferred_date_status'
+INDEX_COLUMNS = ['preferred_date', 'status']
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Built without blocking writes to bookings, as in 0003
+        with op.get_context().autocommit_block():
+            op.create_index(INDEX_NAME, 'bookings', INDEX_COLUMNS, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index(INDEX_NAME, 'bookings', INDEX_COLUMNS, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(INDEX_NAME, table_name='bookings', postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(INDEX_NAME, table_name='bookings')
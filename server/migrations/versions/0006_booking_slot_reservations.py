@@ -0,0 +1,93 @@
+"""Normalized booking slot start and one held booking per dentist slot
+
+Revision ID: 0006_booking_slot_reservations
+Revises: 0005_dentists
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_booking_slot_reservations'
+down_revision = '0005_dentists'
+branch_labels = None
+depends_on = None
+
+
+HELD_WHERE = "status IN ('confirmed', 'completed') AND dentist_id IS NOT NULL"
+
+
+def parse_slot_start(time_slot):
+    """Same parsing as app.parse_time_slot, frozen here for the backfill."""
+    text = (time_slot or '').replace('–', '-').split('-')[0].strip().upper().replace('.', '')
+    suffix = None
+    for marker in ('AM', 'PM'):
+        if text.endswith(marker):
+            suffix, text = marker, text[:-2].strip()
+    hours, _, minutes = text.partition(':')
+    try:
+        hours, minutes = int(hours), int(minutes or 0)
+    except ValueError:
+        return None
+    if suffix:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if suffix == 'PM' else 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('slot_start', sa.Integer(), nullable=True))
+
+    # Backfill from the free-text time_slot. A held booking that would
+    # duplicate an earlier one on the same dentist slot keeps a NULL start
+    # so the unique index can be built; staff can fix it from the calendar.
+    bind = op.get_bind()
+    bookings = sa.table(
+        'bookings',
+        sa.column('id', sa.Integer), sa.column('time_slot', sa.String),
+        sa.column('dentist_id', sa.Integer), sa.column('preferred_date', sa.Date),
+        sa.column('status', sa.String), sa.column('slot_start', sa.Integer)
+    )
+    rows = bind.execute(
+        sa.select(bookings.c.id, bookings.c.time_slot, bookings.c.dentist_id,
+                  bookings.c.preferred_date, bookings.c.status)
+        .where(bookings.c.time_slot.isnot(None))
+        .order_by(bookings.c.id)
+    ).all()
+
+    held = set()
+    updates = []
+    for booking_id, time_slot, dentist_id, preferred_date, status in rows:
+        start = parse_slot_start(time_slot)
+        if start is None:
+            continue
+        if dentist_id is not None and status in ('confirmed', 'completed'):
+            key = (dentist_id, preferred_date, start)
+            if key in held:
+                continue
+            held.add(key)
+        updates.append({'b_id': booking_id, 'b_slot_start': start})
+
+    if updates:
+        bind.execute(
+            bookings.update().where(bookings.c.id == sa.bindparam('b_id'))
+            .values(slot_start=sa.bindparam('b_slot_start')),
+            updates
+        )
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('uq_bookings_dentist_slot_held', ['dentist_id', 'preferred_date', 'slot_start'],
+                              unique=True, postgresql_where=sa.text(HELD_WHERE), sqlite_where=sa.text(HELD_WHERE))
+
+
+def downgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('uq_bookings_dentist_slot_held',
+                            postgresql_where=sa.text(HELD_WHERE), sqlite_where=sa.text(HELD_WHERE))
+        batch_op.drop_column('slot_start')
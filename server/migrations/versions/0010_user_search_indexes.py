@@ -0,0 +1,64 @@
+"""User search and keyset pagination indexes, trigram GIN on Postgres
+
+Revision ID: 0010_user_search_indexes
+Revises: 0009_media_blobs
+Create Date: 2026-10-17 17:30:00.000000
+
+"""
+import warnings
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_user_search_indexes'
+down_revision = '0009_media_blobs'
+branch_labels = None
+depends_on = None
+
+
+KEYSET_INDEXES = [
+    ('ix_users_status_id', ['status', 'id']),
+]
+
+# gin_trgm_ops lets ILIKE '%term%' and 'term%' use the index on Postgres.
+# A plain b-tree cannot serve a leading wildcard, so other databases get
+# no search index and fall back to a scan
+TRGM_INDEXES = [
+    ('ix_users_name_trgm', 'name'),
+    ('ix_users_email_trgm', 'email'),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, columns in KEYSET_INDEXES:
+                op.create_index(name, 'users', columns, unique=False,
+                                postgresql_concurrently=True, if_not_exists=True)
+            try:
+                op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            except sa.exc.DBAPIError as e:
+                # Managed databases may not allow it; search still works unindexed
+                warnings.warn(f'pg_trgm unavailable, skipping user search indexes: {e}')
+                return
+            for name, column in TRGM_INDEXES:
+                op.create_index(name, 'users', [column], unique=False,
+                                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                                postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, columns in KEYSET_INDEXES:
+            op.create_index(name, 'users', columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, _ in reversed(TRGM_INDEXES):
+                op.drop_index(name, table_name='users', postgresql_concurrently=True, if_exists=True)
+            for name, _ in reversed(KEYSET_INDEXES):
+                op.drop_index(name, table_name='users', postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, _ in reversed(KEYSET_INDEXES):
+            op.drop_index(name, table_name='users')
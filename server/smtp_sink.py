@@ -0,0 +1,104 @@
+"""
+Minimal local SMTP sink for development and tests.
+
+Accepts any message without authentication or TLS and keeps it in memory
+(and prints a one-line summary), so the email outbox worker can be run
+without a real mail server:
+
+    python smtp_sink.py --port 1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false flask email-worker
+
+It can also be started in-process with SMTPSink().start().
+"""
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        mail_from, recipients = None, []
+        self.reply('220 smtp-sink ready')
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode(errors='replace').strip()
+            verb = command[:4].upper()
+
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 smtp-sink')
+            elif verb == 'MAIL':
+                mail_from, recipients = command[10:].strip(' <>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(line[1:] if line.startswith(b'..') else line)
+                sink.record(mail_from, recipients, b''.join(lines))
+                self.reply('250 OK: queued')
+            elif verb == 'RSET':
+                mail_from, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink:
+    """Threaded SMTP server that records every message it receives."""
+
+    def __init__(self, host='127.0.0.1', port=0, verbose=False):
+        self.messages = []
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _SMTPHandler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+
+    def record(self, mail_from, recipients, data):
+        message = message_from_bytes(data)
+        with self._lock:
+            self.messages.append({'from': mail_from, 'to': list(recipients), 'message': message})
+        if self.verbose:
+            print(f"📬 {mail_from} -> {', '.join(recipients)}: {message['Subject']}")
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local SMTP sink')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, verbose=True)
+    print(f"📮 SMTP sink listening on {sink.host}:{sink.port}")
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        sink.stop()
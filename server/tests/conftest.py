@@ -0,0 +1,71 @@
+"""
+Test fixtures: the app runs against a throwaway SQLite database, or the
+database in TEST_DATABASE_URL (e.g. an empty Postgres database, to run
+the advisory-lock reservation path).
+
+DATABASE_URL has to be set before app.py is imported, since the engine
+is configured at import time.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix='dentist-tests-')
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault('UPLOADS_ROOT', os.path.join(_db_dir, 'uploads'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app_module.app.config['TESTING'] = True
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        yield app_module.app
+        app_module.db.session.remove()
+        app_module.db.drop_all()
+    # Each test gets a fresh database, so cached versions must not carry over
+    app_module.public_cache._versions.clear()
+    app_module.public_cache._entries.clear()
+    app_module.dentist_calendar._days.clear()
+    app_module.dentist_calendar._versions.clear()
+    app_module.auth_user_cache.sync(None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(app):
+    admin = app_module.User(name='Admin', email='admin@example.com', password='x',
+                            status='admin', is_verified=True)
+    app_module.db.session.add(admin)
+    app_module.db.session.commit()
+    return {'Authorization': f'Bearer {app_module.generate_token(admin)}'}
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a callable that counts the SQL statements run inside a with-block."""
+    class Counter:
+        def __init__(self):
+            self.statements = []
+
+        def _record(self, conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        def __enter__(self):
+            event.listen(app_module.db.engine, 'before_cursor_execute', self._record)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(app_module.db.engine, 'before_cursor_execute', self._record)
+
+    return Counter
@@ -0,0 +1,50 @@
+"""Cached auth users must not outlive a role or password change."""
+import pytest
+from werkzeug.security import generate_password_hash
+
+import app as app_module
+
+
+@pytest.fixture
+def moderator(app, monkeypatch):
+    monkeypatch.setattr(app_module.kdf_pool, 'workers', 0)
+    user = app_module.User(name='Mod', email='mod@example.com', password=generate_password_hash('secret1'),
+                           status='moderator', is_verified=True)
+    app_module.db.session.add(user)
+    app_module.db.session.commit()
+    return user.id, {'Authorization': f'Bearer {app_module.generate_token(user)}'}
+
+
+@pytest.fixture(params=['same worker', 'other worker'])
+def worker(request, monkeypatch):
+    """Run the change here, or as if in another worker that cannot clear this one's cache."""
+    if request.param == 'other worker':
+        monkeypatch.setattr(app_module.auth_user_cache, 'invalidate', lambda user_id: None)
+        monkeypatch.setattr(app_module.public_cache, 'poll_seconds', 0)
+    return request.param
+
+
+def test_role_change_revokes_cached_role(client, admin_headers, moderator, worker):
+    user_id, headers = moderator
+    assert client.get('/api/bookings', headers=headers).status_code == 200
+    assert app_module.auth_user_cache.get(user_id) is not None
+
+    response = client.patch(f'/api/users/{user_id}/role', headers=admin_headers, json={'role': 'user'})
+    assert response.status_code == 200
+
+    assert client.get('/api/bookings', headers=headers).status_code == 403
+
+
+def test_password_change_revokes_old_tokens(client, moderator, worker):
+    user_id, headers = moderator
+    assert client.get('/api/bookings', headers=headers).status_code == 200
+
+    response = client.put('/api/users/change-password', headers=headers,
+                          json={'current_password': 'secret1', 'new_password': 'secret2'})
+    assert response.status_code == 200
+
+    revoked = client.get('/api/bookings', headers=headers)
+    assert revoked.status_code == 401
+    assert revoked.get_json()['message'] == 'Token has been revoked'
+    new_headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+    assert client.get('/api/bookings', headers=new_headers).status_code == 200
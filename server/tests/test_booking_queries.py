@@ -0,0 +1,58 @@
+"""Listing bookings must not issue a query per row (N+1) for service/dentist."""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as app_module
+
+BOOKING_COUNT = 1000
+
+
+@pytest.fixture
+def bookings(app):
+    db = app_module.db
+    services = [app_module.Service(name=f'Service {i}', price=10 * (i + 1), duration_minutes=30) for i in range(5)]
+    dentists = [app_module.Dentist(name=f'Dentist {i}') for i in range(3)]
+    db.session.add_all(services + dentists)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    db.session.add_all([
+        app_module.Booking(
+            customer_name=f'Patient {i}', customer_email=f'patient{i}@example.com', customer_phone='000',
+            service_id=services[i % len(services)].id, dentist_id=dentists[i % len(dentists)].id,
+            preferred_date=date.today(), price=services[i % len(services)].price,
+            created_at=now - timedelta(minutes=i)
+        )
+        for i in range(BOOKING_COUNT)
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def test_list_bookings_runs_one_query(client, admin_headers, bookings, count_queries, monkeypatch):
+    monkeypatch.setattr(app_module, 'BOOKINGS_MAX_PAGE_SIZE', BOOKING_COUNT)
+    url = f'/api/bookings?limit={BOOKING_COUNT}'
+    client.get(url, headers=admin_headers)  # warm the auth cache
+
+    with count_queries() as counter:
+        response = client.get(url, headers=admin_headers)
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data['bookings']) == BOOKING_COUNT
+    assert all(b['service_name'] and b['dentist_name'] for b in data['bookings'])
+    assert len(counter.statements) == 1, counter.statements
+
+
+def test_stream_bookings_runs_one_query(client, admin_headers, bookings, count_queries):
+    url = '/api/bookings?format=ndjson'
+    client.get(url, headers=admin_headers).get_data()  # warm the auth cache
+
+    with count_queries() as counter:
+        response = client.get(url, headers=admin_headers)
+        lines = response.get_data(as_text=True).splitlines()
+
+    assert response.status_code == 200
+    assert len(lines) == BOOKING_COUNT
+    assert len(counter.statements) == 1, counter.statements
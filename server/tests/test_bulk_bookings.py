@@ -0,0 +1,53 @@
+"""A bad item in a bulk status update fails on its own, not the whole batch."""
+from datetime import date
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def setup(app):
+    db = app_module.db
+    service = app_module.Service(name='Cleaning', price=50, duration_minutes=30)
+    dentist = app_module.Dentist(name='Dr. Smile')
+    dentist.services = [service]
+    db.session.add_all([service, dentist])
+    db.session.flush()
+    bookings = [
+        app_module.Booking(customer_name=f'Patient {i}', customer_email=f'p{i}@example.com',
+                           customer_phone='000', service_id=service.id,
+                           preferred_date=date.today(), price=service.price)
+        for i in range(4)
+    ]
+    db.session.add_all(bookings)
+    db.session.commit()
+    return dentist.id, [booking.id for booking in bookings]
+
+
+def test_bad_dentist_ids_fail_per_item(client, admin_headers, setup):
+    dentist_id, booking_ids = setup
+    response = client.patch('/api/bookings/bulk-status', headers=admin_headers, json={'items': [
+        {'booking_id': booking_ids[0], 'status': 'cancelled', 'dentist_id': [1]},
+        {'booking_id': booking_ids[1], 'status': 'cancelled', 'dentist_id': 'abc'},
+        {'booking_id': booking_ids[2], 'status': 'cancelled', 'dentist_id': str(dentist_id)},
+        {'booking_id': booking_ids[3], 'status': 'cancelled', 'dentist_id': dentist_id},
+    ]})
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [result['success'] for result in data['results']] == [False, False, True, True]
+    assert data['results'][0]['message'] == 'dentist_id must be an integer'
+    assert data['results'][2]['booking']['dentist_id'] == dentist_id
+
+
+def test_boolean_booking_id_is_rejected(client, admin_headers, setup):
+    _, booking_ids = setup
+    assert booking_ids[0] == 1
+    response = client.patch('/api/bookings/bulk-status', headers=admin_headers, json={'items': [
+        {'booking_id': True, 'status': 'cancelled'},
+    ]})
+
+    data = response.get_json()
+    assert data['results'] == [{'booking_id': True, 'success': False, 'message': 'booking_id is required'}]
+    assert app_module.db.session.get(app_module.Booking, 1).status == 'pending'
@@ -0,0 +1,111 @@
+"""The daily_stats rollup must agree with a direct aggregate over bookings."""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+import app as app_module
+
+Booking = app_module.Booking
+
+
+@pytest.fixture
+def booking_ids(client):
+    db = app_module.db
+    services = [app_module.Service(name='Cleaning', price=50, duration_minutes=30),
+                app_module.Service(name='Whitening', price=120, duration_minutes=60)]
+    db.session.add_all(services)
+    db.session.commit()
+    ids = []
+    for i in range(6):
+        response = client.post('/api/public/bookings', json={
+            'name': f'Patient {i}', 'email': f'p{i}@example.com', 'phone': '000',
+            'service_id': services[i % 2].id,
+            'preferred_date': (date.today() + timedelta(days=i + 1)).isoformat()
+        })
+        assert response.status_code == 201
+        ids.append(response.get_json()['booking']['id'])
+    return ids
+
+
+def direct_totals():
+    rows = app_module.db.session.query(
+        Booking.status, Booking.service_id, func.count(Booking.id), func.coalesce(func.sum(Booking.price), 0)
+    ).group_by(Booking.status, Booking.service_id).all()
+    by_status = {status: 0 for status in app_module.BOOKING_STATUSES}
+    revenue_by_service = {}
+    for status, service_id, count, revenue in rows:
+        by_status[status] += count
+        if status == 'completed':
+            revenue_by_service[service_id] = revenue_by_service.get(service_id, 0) + float(revenue)
+    return by_status, revenue_by_service
+
+
+def assert_dashboard_matches(client, headers):
+    by_status, revenue_by_service = direct_totals()
+    summary = client.get('/api/dashboard/summary', headers=headers).get_json()['summary']
+    revenue = summary['revenue']['total']
+    summary = summary['bookings']
+    charts = client.get('/api/dashboard/charts', headers=headers).get_json()['charts']
+
+    assert summary['total'] == sum(by_status.values())
+    assert {status: summary[status] for status in by_status} == by_status
+    assert summary['recent_7_days'] == sum(by_status.values())
+    assert revenue == sum(revenue_by_service.values())
+    assert charts['booking_status_distribution'] == by_status
+    assert charts['bookings_over_time'][-1]['bookings'] == sum(by_status.values())
+    assert charts['revenue_over_time'][-1]['revenue'] == sum(revenue_by_service.values())
+    assert {item['service_id']: item['revenue'] for item in charts['revenue_by_service'] if item['revenue']} \
+        == revenue_by_service
+
+
+def rollup_rows():
+    """Non-empty rollup rows; status changes leave zeroed rows that a rebuild does not create."""
+    return sorted(
+        (row.day, row.service_id or 0, row.status, row.bookings_count, float(row.revenue), row.registrations)
+        for row in app_module.DailyStat.query.all()
+        if row.bookings_count or row.revenue or row.registrations
+    )
+
+
+def test_rollup_follows_status_changes(client, admin_headers, booking_ids):
+    assert_dashboard_matches(client, admin_headers)
+
+    def set_status(booking_id, status, **extra):
+        response = client.patch(f'/api/bookings/{booking_id}/status', headers=admin_headers,
+                                json={'status': status, **extra})
+        assert response.status_code == 200, response.get_json()
+
+    set_status(booking_ids[0], 'confirmed', time_slot='10:00')
+    set_status(booking_ids[0], 'completed')
+    set_status(booking_ids[1], 'cancelled')
+    set_status(booking_ids[1], 'cancelled')
+    set_status(booking_ids[2], 'confirmed', time_slot='11:00')
+    assert_dashboard_matches(client, admin_headers)
+
+    response = client.patch('/api/bookings/bulk-status', headers=admin_headers, json={'items': [
+        {'booking_id': booking_ids[2], 'status': 'completed'},
+        {'booking_id': booking_ids[3], 'status': 'completed', 'time_slot': '09:00'},
+        {'booking_id': booking_ids[4], 'status': 'cancelled'},
+        {'booking_id': booking_ids[5], 'status': 'confirmed'},  # fails: no time slot
+        {'booking_id': booking_ids[0], 'status': 'pending'},
+    ]})
+    assert response.get_json()['updated'] == 4
+    assert_dashboard_matches(client, admin_headers)
+
+
+def test_rebuild_matches_incremental_rollup_and_is_idempotent(app, client, admin_headers, booking_ids):
+    client.patch(f'/api/bookings/{booking_ids[0]}/status', headers=admin_headers,
+                 json={'status': 'completed', 'time_slot': '10:00'})
+    client.patch(f'/api/bookings/{booking_ids[1]}/status', headers=admin_headers, json={'status': 'cancelled'})
+    booking_rows = [row for row in rollup_rows() if row[2] != app_module.REGISTRATION_STAT_STATUS]
+
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['rebuild-daily-stats']).exit_code == 0
+    rebuilt = rollup_rows()
+    assert [row for row in rebuilt if row[2] != app_module.REGISTRATION_STAT_STATUS] == booking_rows
+
+    assert runner.invoke(args=['rebuild-daily-stats']).exit_code == 0
+    assert runner.invoke(args=['rebuild-daily-stats', '--since', date.today().isoformat()]).exit_code == 0
+    assert rollup_rows() == rebuilt
+    assert_dashboard_matches(client, admin_headers)
@@ -0,0 +1,107 @@
+"""Outbox emails are queued with the booking and delivered by deliver_outbox_batch."""
+import socket
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as app_module
+from smtp_sink import SMTPSink
+
+EmailOutbox = app_module.EmailOutbox
+
+
+@pytest.fixture
+def sink():
+    sink = SMTPSink().start()
+    yield sink
+    sink.stop()
+
+
+@pytest.fixture
+def smtp(app, monkeypatch):
+    """Point Flask-Mail at a host:port; returns a setter."""
+    state = app.extensions['mail']
+    monkeypatch.setattr(state, 'use_tls', False)
+    monkeypatch.setattr(state, 'use_ssl', False)
+    monkeypatch.setattr(state, 'username', None)
+    monkeypatch.setattr(state, 'suppress', False)
+    monkeypatch.setattr(state, 'default_sender', 'clinic@example.com')
+
+    def point_at(host, port):
+        monkeypatch.setattr(state, 'server', host)
+        monkeypatch.setattr(state, 'port', port)
+    return point_at
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def booking_email(client):
+    service = app_module.Service(name='Cleaning', price=50, duration_minutes=30)
+    app_module.db.session.add(service)
+    app_module.db.session.commit()
+    response = client.post('/api/public/bookings', json={
+        'name': 'Pat', 'email': 'pat@example.com', 'phone': '000',
+        'service_id': service.id, 'preferred_date': date.today().isoformat()
+    })
+    assert response.status_code == 201
+    return EmailOutbox.query.one()
+
+
+def test_booking_queues_email_in_its_transaction(client, booking_email):
+    assert booking_email.recipient == 'pat@example.com'
+    assert booking_email.status == 'pending'
+    assert booking_email.attempts == 0
+
+
+def test_failed_delivery_backs_off_then_succeeds(app, smtp, sink, closed_port, booking_email):
+    smtp('127.0.0.1', closed_port)
+    before = datetime.utcnow()
+
+    assert app_module.deliver_outbox_batch() == 1
+    email = app_module.db.session.get(EmailOutbox, booking_email.id)
+    assert email.status == 'pending'
+    assert email.attempts == 1
+    assert email.last_error
+    base = app.config['EMAIL_RETRY_BASE_SECONDS']
+    assert email.next_attempt_at >= before + timedelta(seconds=base)
+
+    # Not due yet, even with the server reachable again
+    smtp(sink.host, sink.port)
+    assert app_module.deliver_outbox_batch() == 0
+    assert sink.messages == []
+
+    email.next_attempt_at = datetime.utcnow()
+    app_module.db.session.commit()
+    assert app_module.deliver_outbox_batch() == 1
+
+    email = app_module.db.session.get(EmailOutbox, booking_email.id)
+    assert email.status == 'sent'
+    assert email.sent_at is not None
+    assert email.last_error is None
+    assert [m['to'] for m in sink.messages] == [['pat@example.com']]
+    assert sink.messages[0]['message']['Subject'] == 'We received your appointment request'
+    assert app_module.deliver_outbox_batch() == 0
+
+
+def test_retry_delay_doubles_and_gives_up(app, smtp, closed_port, booking_email, monkeypatch):
+    monkeypatch.setitem(app.config, 'EMAIL_MAX_ATTEMPTS', 3)
+    smtp('127.0.0.1', closed_port)
+    base = app.config['EMAIL_RETRY_BASE_SECONDS']
+    assert app_module.email_retry_delay(1) == timedelta(seconds=base)
+    assert app_module.email_retry_delay(2) == timedelta(seconds=2 * base)
+
+    for _ in range(3):
+        email = app_module.db.session.get(EmailOutbox, booking_email.id)
+        email.next_attempt_at = datetime.utcnow()
+        app_module.db.session.commit()
+        assert app_module.deliver_outbox_batch() == 1
+
+    email = app_module.db.session.get(EmailOutbox, booking_email.id)
+    assert email.status == 'failed'
+    assert email.attempts == 3
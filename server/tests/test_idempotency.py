@@ -0,0 +1,93 @@
+"""Idempotency-Key handling on POST /api/public/bookings."""
+import time
+from datetime import date
+
+import pytest
+from flask import g
+
+import app as app_module
+
+IdempotencyKey = app_module.IdempotencyKey
+
+
+@pytest.fixture
+def booking_body(app):
+    service = app_module.Service(name='Cleaning', price=50, duration_minutes=30)
+    app_module.db.session.add(service)
+    app_module.db.session.commit()
+    return {'name': 'Pat', 'email': 'pat@example.com', 'phone': '000',
+            'service_id': service.id, 'preferred_date': date.today().isoformat()}
+
+
+def post_booking(client, body, key):
+    return client.post('/api/public/bookings', json=body, headers={'Idempotency-Key': key})
+
+
+def test_retry_replays_stored_response(client, booking_body):
+    first = post_booking(client, booking_body, 'key-1')
+    retry = post_booking(client, dict(reversed(list(booking_body.items()))), 'key-1')
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert retry.get_json() == first.get_json()
+    assert app_module.Booking.query.count() == 1
+    assert app_module.EmailOutbox.query.count() == 1
+    stored = app_module.db.session.get(IdempotencyKey, ('public_bookings', 'key-1'))
+    assert stored.status == 'completed'
+    assert stored.response_status == 201
+
+
+def test_same_key_with_different_body_is_rejected(client, booking_body):
+    post_booking(client, booking_body, 'key-1')
+    response = post_booking(client, {**booking_body, 'name': 'Someone else'}, 'key-1')
+
+    assert response.status_code == 422
+    assert app_module.Booking.query.count() == 1
+
+
+def test_server_error_releases_key_and_rolls_back(client, booking_body, monkeypatch):
+    def broken_email(booking):
+        raise RuntimeError('outbox unavailable')
+    monkeypatch.setattr(app_module, 'queue_booking_request_email', broken_email)
+
+    assert post_booking(client, booking_body, 'key-1').status_code == 500
+    assert app_module.Booking.query.count() == 0
+    assert app_module.db.session.get(IdempotencyKey, ('public_bookings', 'key-1')) is None
+
+    monkeypatch.undo()
+    retry = post_booking(client, booking_body, 'key-1')
+    assert retry.status_code == 201
+    assert 'Idempotent-Replayed' not in retry.headers
+    assert app_module.Booking.query.count() == 1
+
+
+def test_request_that_lost_its_claim_does_not_record(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDEMPOTENCY_LOCK_SECONDS', 0)
+    outcome, first_claim = app_module.claim_idempotency_key('test', 'key-1', 'hash')
+    assert outcome == 'claimed'
+
+    # The first request looks stale, so a retry takes the key over
+    time.sleep(0.01)
+    outcome, second_claim = app_module.claim_idempotency_key('test', 'key-1', 'hash')
+    assert outcome == 'claimed'
+    assert second_claim > first_claim
+
+    with app.test_request_context():
+        g.idempotency_claim = ('test', 'key-1', first_claim)
+        with pytest.raises(app_module.IdempotencyClaimLost):
+            app_module.record_idempotent_response({'success': True}, 201)
+    app_module.db.session.rollback()
+
+    # Nor does its error response release the new owner's claim
+    app_module.finish_idempotency_key('test', 'key-1', first_claim, app.response_class(status=500))
+    row = app_module.db.session.get(IdempotencyKey, ('test', 'key-1'), populate_existing=True)
+    assert row.status == 'in_progress'
+    assert row.locked_at == second_claim
+
+
+def test_purge_throttle_lets_one_caller_through_per_interval():
+    throttle = app_module.Throttle(60)
+
+    assert throttle.ready()
+    assert not throttle.ready()
@@ -0,0 +1,37 @@
+"""Derivative widths are based on the original image, not its reduced JPEG decode."""
+import io
+
+import pytest
+from PIL import Image
+
+import app as app_module
+
+
+def upload_jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(buffer, 'JPEG')
+    buffer.seek(0)
+    return app_module.store_media(buffer, 'jpg')
+
+
+@pytest.fixture(autouse=True)
+def webp_only(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMAGE_VARIANT_FORMATS', ['webp'])
+
+
+def variant_widths(variants):
+    return [item['width'] for item in variants['formats']['image/webp']]
+
+
+def test_source_at_largest_width_gets_that_variant(app):
+    variants = app_module.build_image_variants(upload_jpeg(1920, 1080))
+
+    assert variant_widths(variants) == [320, 640, 960, 1280, 1920]
+
+
+def test_large_jpeg_records_original_size(app):
+    variants = app_module.build_image_variants(upload_jpeg(8000, 6000))
+
+    assert (variants['width'], variants['height']) == (8000, 6000)
+    assert variant_widths(variants) == [320, 640, 960, 1280, 1920]
+    assert variants['formats']['image/webp'][-1]['height'] == 1440
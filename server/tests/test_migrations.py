@@ -0,0 +1,15 @@
+"""The migrations build the schema the models describe (what `flask db check` verifies)."""
+import os
+import flask_migrate
+import app as app_module
+
+MIGRATIONS = os.path.join(os.path.dirname(app_module.__file__), 'migrations')
+
+
+def test_models_match_migrations(app):
+    app_module.db.drop_all()
+    flask_migrate.upgrade(directory=MIGRATIONS)
+    try:
+        flask_migrate.check(directory=MIGRATIONS)
+    finally:
+        flask_migrate.downgrade(directory=MIGRATIONS, revision='base')
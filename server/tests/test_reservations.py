@@ -0,0 +1,115 @@
+"""Concurrent reservations for one slot must leave exactly one holding booking."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from threading import Barrier
+
+import pytest
+
+import app as app_module
+
+WORKERS = 8
+
+
+@pytest.fixture
+def slot(app):
+    db = app_module.db
+    service = app_module.Service(name='Cleaning', price=50, duration_minutes=30)
+    dentist = app_module.Dentist(name='Dr. Smile')
+    dentist.services = [service]
+    db.session.add_all([service, dentist])
+    db.session.commit()
+    day = date.today() + timedelta(days=7)
+    while day.weekday() == 6:
+        day += timedelta(days=1)
+    return service.id, dentist.id, day
+
+
+def reserve_concurrently(app, payloads):
+    barrier = Barrier(len(payloads))
+
+    def reserve(payload):
+        client = app.test_client()
+        barrier.wait()
+        return client.post('/api/public/reservations', json=payload).status_code
+
+    with ThreadPoolExecutor(len(payloads)) as pool:
+        return list(pool.map(reserve, payloads))
+
+
+def reservation(index, service_id, day, dentist_id=None, time_slot='10:00'):
+    return {'name': f'Patient {index}', 'email': f'p{index}@example.com', 'phone': '000',
+            'service_id': service_id, 'dentist_id': dentist_id,
+            'preferred_date': day.isoformat(), 'time_slot': time_slot}
+
+
+@pytest.mark.parametrize('assigned', [True, False], ids=['dentist', 'unassigned'])
+def test_one_winner_per_slot(app, slot, assigned):
+    service_id, dentist_id, day = slot
+    statuses = reserve_concurrently(app, [
+        reservation(i, service_id, day, dentist_id if assigned else None) for i in range(WORKERS)
+    ])
+
+    assert sorted(statuses) == [201] + [409] * (WORKERS - 1)
+    holding = app_module.Booking.query.filter(
+        app_module.Booking.preferred_date == day,
+        app_module.Booking.status.in_(app_module.SLOT_HOLDING_STATUSES)
+    ).count()
+    assert holding == 1
+
+
+def test_reservation_moves_day_version_by_one(client, slot):
+    service_id, dentist_id, day = slot
+    calendar = app_module.dentist_calendar
+    namespace = app_module.booking_day_namespace(day)
+
+    calendar.get_day(dentist_id, day, fresh=True)
+    response = client.post('/api/public/reservations', json=reservation(0, service_id, day, dentist_id))
+    assert response.status_code == 201
+
+    version = app_module.db.session.get(app_module.CacheVersion, namespace).version
+    assert version == 1
+    # Applied incrementally instead of evicted for a reload
+    entry = calendar._days[day][dentist_id]
+    assert entry.version == version
+    assert entry.conflict(600, 630, ()) == response.get_json()['booking']['id']
+
+
+def test_lengthened_service_blocks_overlapping_reservation(client, admin_headers, slot):
+    service_id, dentist_id, day = slot
+    assert client.post('/api/public/reservations',
+                       json=reservation(0, service_id, day, dentist_id, '10:00')).status_code == 201
+    # Cache the day's intervals with the 30-minute end time
+    app_module.dentist_calendar.get_day(dentist_id, day, fresh=True)
+
+    response = client.put(f'/api/services/{service_id}', headers=admin_headers, json={'duration_minutes': 60})
+    assert response.status_code == 200
+
+    response = client.post('/api/public/reservations', json=reservation(1, service_id, day, dentist_id, '10:30'))
+    assert response.status_code == 409
+
+
+@pytest.mark.parametrize('path', ['/api/public/reservations', '/api/public/bookings'])
+@pytest.mark.parametrize('dentist_id', ['1', [1], 1.5, True])
+def test_non_integer_dentist_id_is_rejected(client, slot, path, dentist_id):
+    service_id, _, day = slot
+    response = client.post(path, json={**reservation(0, service_id, day), 'dentist_id': dentist_id})
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'dentist_id must be an integer'
+
+
+def test_dentist_reservations_share_clinic_capacity(client, slot, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'CLINIC_CAPACITY', 1)
+    service_id, dentist_id, day = slot
+    assert client.post('/api/public/reservations',
+                       json=reservation(0, service_id, day, None, '10:00')).status_code == 201
+
+    response = client.post('/api/public/reservations', json=reservation(1, service_id, day, dentist_id, '10:00'))
+    assert response.status_code == 409
+    assert response.get_json()['message'] == 'That time slot is fully booked'
+
+    slots = client.get('/api/time-slots/available', query_string={
+        'date': day.isoformat(), 'service_id': service_id, 'dentist_id': dentist_id
+    }).get_json()['slots']
+    assert '10:00' not in [s['start'] for s in slots]
+    assert '10:30' in [s['start'] for s in slots]
@@ -0,0 +1,112 @@
+"""The S3 storage backend against moto's in-process S3 stand-in."""
+import io
+import os
+from urllib.parse import urlparse
+
+import pytest
+
+import app as app_module
+
+moto = pytest.importorskip('moto')
+boto3 = pytest.importorskip('boto3')
+
+BUCKET = 'dentist-media'
+
+
+@pytest.fixture
+def s3(app, monkeypatch):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        monkeypatch.setenv(name, 'testing')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        storage = app_module.S3Storage(BUCKET, prefix='media/', region='us-east-1',
+                                       multipart_threshold=5 * 1024 * 1024,
+                                       multipart_chunksize=5 * 1024 * 1024)
+        monkeypatch.setattr(app_module, 'media_storage', storage)
+        yield client
+
+
+def object_keys(client):
+    return sorted(obj['Key'] for obj in client.list_objects_v2(Bucket=BUCKET).get('Contents', []))
+
+
+def test_save_open_trash_restore(s3):
+    storage = app_module.media_storage
+    url = app_module.store_upload('services/logo.png', io.BytesIO(b'png bytes'))
+
+    assert url == '/uploads/services/logo.png'
+    assert storage.exists('services/logo.png')
+    with storage.open('services/logo.png') as f:
+        assert f.read() == b'png bytes'
+    head = s3.head_object(Bucket=BUCKET, Key='media/services/logo.png')
+    assert head['ContentType'] == 'image/png'
+
+    assert storage.trash('services/logo.png')
+    assert not storage.exists('services/logo.png')
+    storage.restore('services/logo.png')
+    assert storage.exists('services/logo.png')
+    assert object_keys(s3) == ['media/services/logo.png']
+    assert not storage.trash('services/missing.png')
+
+
+def test_multipart_upload(s3):
+    payload = os.urandom(6 * 1024 * 1024)
+    app_module.store_upload('videos/intro.mp4', io.BytesIO(payload))
+
+    with app_module.media_storage.open('videos/intro.mp4') as f:
+        assert f.read() == payload
+
+
+def test_store_media_dedupes_and_gc_deletes_objects(s3, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MEDIA_GC_GRACE_SECONDS', -60)
+    kept = app_module.store_media(io.BytesIO(b'kept'), 'jpg')
+    assert app_module.store_media(io.BytesIO(b'kept'), 'jpeg') == kept
+    orphan = app_module.store_media(io.BytesIO(b'orphan'), 'jpg')
+    app_module.db.session.add(app_module.ContentBlock(key='hero_image', media_url=kept))
+    app_module.db.session.commit()
+
+    assert app_module.collect_media_garbage() == 1
+    assert app_module.media_storage.exists(app_module.media_key(kept))
+    assert not app_module.media_storage.exists(app_module.media_key(orphan))
+    assert object_keys(s3) == [f'media/{app_module.media_key(kept)}']
+
+
+def test_uploaded_file_redirects_to_presigned_url(client, s3):
+    app_module.store_upload('services/logo.png', io.BytesIO(b'png bytes'))
+
+    response = client.get('/uploads/services/logo.png')
+
+    assert response.status_code == 302
+    location = urlparse(response.headers['Location'])
+    assert location.path.endswith('/media/services/logo.png')
+    assert 'Signature' in location.query or 'X-Amz-Signature' in location.query
+    assert response.headers['Cache-Control'].startswith('private')
+
+
+def test_uploaded_file_redirects_permanently_to_public_url(client, s3):
+    app_module.media_storage.public_base = 'https://cdn.example.com'
+
+    response = client.get('/uploads/content/0123456789abcdef0123.jpg')
+
+    assert response.status_code == 301
+    assert response.headers['Location'] == 'https://cdn.example.com/media/content/0123456789abcdef0123.jpg'
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+def test_copy_media_to_storage(app, s3, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOADS_ROOT', str(tmp_path))
+    (tmp_path / 'services').mkdir()
+    (tmp_path / 'services' / 'logo.png').write_bytes(b'png bytes')
+    (tmp_path / 'services' / 'old.png.gc').write_bytes(b'trashed')
+    (tmp_path / '.staging').mkdir()
+    (tmp_path / '.staging' / 'upload.tmp').write_bytes(b'partial')
+
+    runner = app.test_cli_runner()
+    first = runner.invoke(args=['copy-media-to-storage'])
+    second = runner.invoke(args=['copy-media-to-storage'])
+
+    assert 'Copied 1 file(s)' in first.output
+    assert 'Copied 0 file(s)' in second.output
+    assert object_keys(s3) == ['media/services/logo.png']
+    assert (tmp_path / 'services' / 'logo.png').exists()
@@ -0,0 +1,70 @@
+"""Search and keyset pagination for GET /api/users."""
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def users(app, admin_headers):
+    db = app_module.db
+    db.session.add_all([
+        app_module.User(name=f'Patient {i:02d}', email=f'patient{i:02d}@example.com', password='x',
+                        status='moderator' if i % 5 == 0 else 'user', is_verified=i % 2 == 0)
+        for i in range(25)
+    ] + [
+        app_module.User(name='Ann O_Brien', email='ann@clinic.test', password='x', is_verified=True),
+        app_module.User(name='Zed 100%', email='zed@clinic.test', password='x', is_verified=True),
+    ])
+    db.session.commit()
+
+
+def search(client, headers, **params):
+    response = client.get('/api/users', headers=headers, query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_pages_cover_every_match_once_newest_first(client, admin_headers, users):
+    seen = []
+    cursor = None
+    while True:
+        params = {'q': 'patient', 'limit': 10}
+        if cursor:
+            params['cursor'] = cursor
+        page = search(client, admin_headers, **params)
+        seen += [user['id'] for user in page['users']]
+        cursor = page['next_cursor']
+        assert page['has_more'] == (cursor is not None)
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_search_matches_name_or_email_case_insensitively(client, admin_headers, users):
+    names = [user['name'] for user in search(client, admin_headers, q='CLINIC.TEST')['users']]
+    assert names == ['Zed 100%', 'Ann O_Brien']
+    assert [user['name'] for user in search(client, admin_headers, q='brien')['users']] == ['Ann O_Brien']
+    assert search(client, admin_headers, q='brien', match='prefix')['users'] == []
+    assert [user['name'] for user in search(client, admin_headers, q='ann', match='prefix')['users']] == ['Ann O_Brien']
+
+
+def test_wildcards_in_the_term_match_literally(client, admin_headers, users):
+    assert [user['name'] for user in search(client, admin_headers, q='%')['users']] == ['Zed 100%']
+    assert [user['name'] for user in search(client, admin_headers, q='o_b')['users']] == ['Ann O_Brien']
+    assert search(client, admin_headers, q='patient_')['users'] == []
+
+
+def test_filters_combine_with_search(client, admin_headers, users):
+    found = search(client, admin_headers, q='patient', status='moderator', is_verified='true', limit=200)['users']
+
+    assert sorted(user['name'] for user in found) == ['Patient 00', 'Patient 10', 'Patient 20']
+
+
+@pytest.mark.parametrize('params', [
+    {'match': 'regex'}, {'status': 'owner'}, {'is_verified': 'maybe'},
+    {'cursor': 'abc'}, {'limit': 'ten'}, {'q': 'x' * 101},
+])
+def test_invalid_parameters_are_rejected(client, admin_headers, params):
+    assert client.get('/api/users', headers=admin_headers, query_string=params).status_code == 400